@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Recall/latency benchmark of the vector database backends
+Generated by Journal Scout
+
+Builds every selected backend and setting over the same vectors (chunk vectors
+of a papers folder, or a synthetic clustered corpus), runs a fixed query set
+against each, and reports build time, on-disk size, RSS growth, p50/p95/p99
+single-query latency, QPS at several client thread counts, and recall@k
+against exact search (``IndexFlatIP``). The report is written as JSON and
+summarized as a table.
+
+Requirements:
+  pip install faiss-cpu
+  pip install sentence-transformers chromadb qdrant-client   # for --papers-dir / the chroma and qdrant configs
+
+Usage:
+  python benchmark_index.py                                  # synthetic 20k x 384, every FAISS index type
+  python benchmark_index.py --docs 200000 --configs faiss:flat,faiss:hnsw,faiss:ivfsq8
+  python benchmark_index.py --papers-dir ./papers --configs faiss:auto,chroma,qdrant
+  python benchmark_index.py --configs chroma:fast-build,chroma:balanced,chroma:high-recall
+  python benchmark_index.py --threads 1,2,4,8 --k 10 --output report.json
+  python benchmark_index.py --configs qdrant --qdrant-url http://localhost:6333  # Qdrant's HNSW, on a server
+
+Each config is ``backend`` or ``backend:setting``; the FAISS settings are the
+--faiss-index types of the builder, the Chroma ones its --chroma-profile names. Queries are corpus vectors with a little
+noise (or the lines of --query-file, encoded with the model). Per-query
+latency is measured with FAISS on one OpenMP thread, so client threads are
+what scales the QPS column.
+
+Qdrant's local mode (the default, no --qdrant-url) builds no HNSW graph and
+scans every vector in Python, so its row is labelled an exact scan; give a
+server with --qdrant-url to measure Qdrant's HNSW index.
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import faiss
+import numpy as np
+
+from vectordb_chunking import normalize
+from vectordb_common import CHROMA_PROFILES, FAISS_INDEX_TYPES, MAX_BATCH_TOKENS, chunk_key
+from vectordb_faiss_index import apply_search_params, build_index, choose_index, save_index
+from vectordb_vectors import EXACT_BLOCK, exact_search
+
+# Configuration
+MODEL_NAME = 'all-MiniLM-L6-v2'
+DEFAULT_DOCS = 20_000
+DEFAULT_DIM = 384
+DEFAULT_CONFIGS = ",".join(f"faiss:{kind}" for kind in FAISS_INDEX_TYPES if kind != "auto") + ",chroma,qdrant"
+QUERY_NOISE = 0.1  # relative noise added to corpus vectors used as queries
+UPLOAD_BATCH = 1_000  # vectors per Chroma/Qdrant write
+INDEX_POLL_SECONDS = 0.5  # how often a Qdrant server is asked whether its HNSW graph is built
+
+
+def synthetic_vectors(n, dim, seed=0):
+    """Unit vectors around ``n / 100`` random topics, roughly like sentence embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, n // 100), dim)).astype('float32')
+    topics = rng.integers(0, len(centers), n)
+    return normalize(centers[topics] + 0.8 * rng.standard_normal((n, dim)).astype('float32')).astype('float32')
+
+
+def paper_vectors(papers_dir, model, max_batch_tokens):
+    """Unit chunk vectors of every paper in ``papers_dir``, embedded like the builder does."""
+    from vectordb_chunking import Chunker
+    from vectordb_common import iter_papers, list_papers
+    from vectordb_embed import Embedder
+
+    chunks = Chunker.for_model(model).split_all(iter_papers(papers_dir, list_papers(papers_dir)))
+    return normalize(Embedder(model, max_batch_tokens).encode_chunks(chunks)).astype('float32')
+
+
+def make_queries(vectors, n, seed=1):
+    rng = np.random.default_rng(seed)
+    picked = vectors[rng.choice(len(vectors), min(n, len(vectors)), replace=False)]
+    noise = rng.standard_normal(picked.shape).astype('float32') * QUERY_NOISE / np.sqrt(vectors.shape[1])
+    return normalize(picked + noise).astype('float32')
+
+
+def exact_top_k(vectors, queries, k):
+    """Ground truth: top ``k`` row numbers by inner product, scanning the corpus in blocks."""
+    blocks = ((np.arange(start, start + len(vectors[start:start + EXACT_BLOCK])), vectors[start:start + EXACT_BLOCK])
+              for start in range(0, len(vectors), EXACT_BLOCK))
+    return exact_search(queries, blocks, k)[1]
+
+
+def recall(found, truth):
+    k = truth.shape[1]
+    return float(np.mean([len(set(a) & set(b)) / k for a, b in zip(found, truth)]))
+
+
+def rss_mb():
+    """Current resident set size (peak RSS where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def dir_size_mb(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path) / (1024 * 1024)
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names) / (1024 * 1024)
+
+
+class FaissTarget:
+    """One FAISS index type, built like the FAISS backend builds it."""
+
+    def __init__(self, kind, workdir, args):
+        self.kind = kind
+        self.path = os.path.join(workdir, "index.faiss")
+
+    def build(self, vectors):
+        spec = choose_index(len(vectors), vectors.shape[1], self.kind)
+        self.name = f"faiss:{self.kind} ({spec['factory']})"
+        self.index = build_index(spec, vectors.shape[1], np.arange(len(vectors)), lambda ids: vectors[ids])
+        apply_search_params(self.index, spec["search"])
+        save_index(self.index, self.path)
+        return self.path
+
+    def search(self, queries, k):
+        return self.index.search(queries, k)[1]
+
+
+class ChromaTarget:
+    """A Chroma collection with one of the builder's HNSW profiles (--chroma-profile)."""
+
+    def __init__(self, setting, workdir, args):
+        import chromadb
+
+        self.profile = "balanced" if setting == "auto" else setting
+        if self.profile not in CHROMA_PROFILES:
+            raise ValueError(f"Unknown Chroma profile {setting!r}; expected one of {', '.join(CHROMA_PROFILES)}")
+        self.name = f"chroma:{self.profile}"
+        self.path = workdir
+        self.client = chromadb.PersistentClient(path=workdir)
+
+    def build(self, vectors):
+        metadata = {"hnsw:space": "cosine", **{f"hnsw:{k}": v for k, v in CHROMA_PROFILES[self.profile].items()}}
+        self.collection = self.client.create_collection(name="benchmark", metadata=metadata)
+        batch = min(UPLOAD_BATCH, self.client.get_max_batch_size())
+        for start in range(0, len(vectors), batch):
+            part = vectors[start:start + batch]
+            self.collection.add(ids=[chunk_key(i) for i in range(start, start + len(part))], embeddings=part.tolist())
+        return self.path
+
+    def search(self, queries, k):
+        result = self.collection.query(query_embeddings=queries.tolist(), n_results=k, include=[])
+        return np.array([[int(key.split('_', 1)[1]) for key in keys] + [-1] * (k - len(keys))
+                         for keys in result["ids"]])
+
+
+class QdrantTarget:
+    """A Qdrant collection: HNSW on a server (--qdrant-url), an exact scan in local mode."""
+
+    def __init__(self, setting, workdir, args):
+        from qdrant_client import QdrantClient
+
+        self.url = args.qdrant_url
+        self.path = workdir
+        self.collection = f"benchmark_{os.path.basename(workdir)}"
+        if self.url:
+            self.name = "qdrant (HNSW)"
+            self.client = QdrantClient(url=self.url, api_key=os.environ.get("QDRANT_API_KEY"))
+        else:
+            self.name = "qdrant (local, exact scan)"
+            self.client = QdrantClient(path=workdir)
+
+    def build(self, vectors):
+        from qdrant_client.models import CollectionStatus, Distance, OptimizersConfigDiff, PointStruct, VectorParams
+
+        self.client.create_collection(
+            self.collection,
+            vectors_config=VectorParams(size=vectors.shape[1], distance=Distance.COSINE),
+            # Index every segment, however small, so the benchmark measures the graph rather than a plain scan
+            optimizers_config=OptimizersConfigDiff(indexing_threshold=1) if self.url else None,
+        )
+        for start in range(0, len(vectors), UPLOAD_BATCH):
+            part = vectors[start:start + UPLOAD_BATCH]
+            self.client.upsert(self.collection, points=[
+                PointStruct(id=start + i, vector=v.tolist()) for i, v in enumerate(part)
+            ], wait=True)
+        if self.url:
+            # The server builds the graph in the background; the build ends when it is done
+            while self.client.get_collection(self.collection).status != CollectionStatus.GREEN:
+                time.sleep(INDEX_POLL_SECONDS)
+            return None
+        return self.path
+
+    def search(self, queries, k):
+        found = []
+        for query in queries:
+            points = self.client.query_points(self.collection, query=query.tolist(), limit=k).points
+            found.append([p.id for p in points] + [-1] * (k - len(points)))
+        return np.array(found)
+
+    def close(self):
+        if self.url:
+            self.client.delete_collection(self.collection)
+        self.client.close()
+
+
+TARGETS = {"faiss": FaissTarget, "chroma": ChromaTarget, "qdrant": QdrantTarget}
+
+
+def latencies_ms(target, queries, k):
+    times = []
+    for query in queries:
+        start = time.perf_counter()
+        target.search(query[None, :], k)
+        times.append((time.perf_counter() - start) * 1000)
+    return np.array(times)
+
+
+def qps(target, queries, k, threads):
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        start = time.perf_counter()
+        list(pool.map(lambda q: target.search(q[None, :], k), queries))
+        return len(queries) / (time.perf_counter() - start)
+
+
+def run_config(config, vectors, queries, truth, args):
+    backend, _, setting = config.partition(':')
+    if backend not in TARGETS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {', '.join(TARGETS)}")
+    workdir = tempfile.mkdtemp(prefix=f"bench_{backend}_", dir=args.workdir)
+    target = None
+    try:
+        target = TARGETS[backend](setting or "auto", workdir, args)
+        rss_before = rss_mb()
+        start = time.perf_counter()
+        path = target.build(vectors)
+        build_seconds = time.perf_counter() - start
+        rss_growth = rss_mb() - rss_before
+
+        found = target.search(queries, args.k)
+        omp_threads = faiss.omp_get_max_threads()
+        faiss.omp_set_num_threads(1)
+        try:
+            times = latencies_ms(target, queries, args.k)
+            throughput = {str(t): qps(target, queries, args.k, t) for t in args.threads}
+        finally:
+            faiss.omp_set_num_threads(omp_threads)
+        return {
+            "config": config,
+            "name": target.name,
+            "buildSeconds": build_seconds,
+            "sizeMB": None if path is None else dir_size_mb(path),  # None: stored on a server
+            "rssGrowthMB": rss_growth,
+            "latencyMs": {f"p{p}": float(np.percentile(times, p)) for p in (50, 95, 99)},
+            "qps": throughput,
+            f"recall@{args.k}": recall(found, truth),
+        }
+    finally:
+        if hasattr(target, "close"):
+            target.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark recall and latency of the vector database backends")
+    parser.add_argument("--papers-dir", help="benchmark on the chunk vectors of this folder instead of a synthetic corpus")
+    parser.add_argument("--docs", type=int, default=DEFAULT_DOCS, help="vectors in the synthetic corpus")
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIM, help="dimension of the synthetic corpus")
+    parser.add_argument("--queries", type=int, default=200, help="queries sampled from the corpus")
+    parser.add_argument("--query-file", help="text file with one query per line, encoded with --model")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--max-batch-tokens", type=int, default=MAX_BATCH_TOKENS)
+    parser.add_argument("--configs", default=DEFAULT_CONFIGS,
+                        help="comma-separated backend[:setting] list (faiss:<index type>, chroma[:<profile>], qdrant)")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--threads", default="1,2,4", help="client thread counts to measure QPS at")
+    parser.add_argument("--workdir", default=None, help="where the benchmark stores are built (default: system temp)")
+    parser.add_argument("--qdrant-url", default=None,
+                        help="Qdrant server to benchmark (API key from QDRANT_API_KEY; default: local mode, an exact scan)")
+    parser.add_argument("--output", default="benchmark_index.json", help="JSON report path")
+    args = parser.parse_args()
+    args.threads = [int(t) for t in args.threads.split(',') if t]
+
+    model = None
+    if args.papers_dir or args.query_file:
+        from sentence_transformers import SentenceTransformer
+
+        print("Loading embedding model...")
+        model = SentenceTransformer(args.model)
+    if args.papers_dir:
+        print(f"Embedding papers in {args.papers_dir}...")
+        vectors = paper_vectors(args.papers_dir, model, args.max_batch_tokens)
+    else:
+        vectors = synthetic_vectors(args.docs, args.dim)
+    if args.query_file:
+        with open(args.query_file, 'r', encoding='utf-8') as f:
+            texts = [line.strip() for line in f if line.strip()]
+        queries = normalize(model.encode(texts)).astype('float32')
+    else:
+        queries = make_queries(vectors, args.queries)
+    args.k = min(args.k, len(vectors))
+    print(f"Corpus: {len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries, k={args.k}")
+    truth = exact_top_k(vectors, queries, args.k)
+
+    results = []
+    for config in (c.strip() for c in args.configs.split(',') if c.strip()):
+        print(f"  Benchmarking {config}...")
+        try:
+            results.append(run_config(config, vectors, queries, truth, args))
+        except ImportError as exc:
+            print(f"  Skipped {config}: {exc}")
+
+    report = {
+        "corpus": {"source": args.papers_dir or "synthetic", "vectors": len(vectors), "dim": int(vectors.shape[1])},
+        "queries": len(queries),
+        "k": args.k,
+        "threads": args.threads,
+        "results": results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=1)
+
+    qps_columns = "".join(f"{f'qps@{t}':>10}" for t in args.threads)
+    print(f"\n{'config':<34} {'build s':>8} {'size MB':>8} {'RSS MB':>7} {'p50 ms':>7} {'p95 ms':>7} "
+          f"{'p99 ms':>7}{qps_columns} {f'recall@{args.k}':>10}")
+    for r in results:
+        latency = r["latencyMs"]
+        qps_values = "".join(f"{r['qps'][str(t)]:>10.0f}" for t in args.threads)
+        size = "-" if r["sizeMB"] is None else f"{r['sizeMB']:.1f}"
+        print(f"{r['name']:<34} {r['buildSeconds']:>8.2f} {size:>8} {r['rssGrowthMB']:>7.0f} "
+              f"{latency['p50']:>7.2f} {latency['p95']:>7.2f} {latency['p99']:>7.2f}{qps_values} "
+              f"{r[f'recall@{args.k}']:>10.3f}")
+    print(f"\n✅ Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Vector Database Builder: FAISS, ChromaDB, Qdrant and the Journal Scout export in one pass
+Generated by Journal Scout
+
+Requirements:
+  pip install sentence-transformers
+  pip install faiss-cpu chromadb qdrant-client   # only those of the backends you select
+
+Usage:
+  python create_vectordb.py                          # every backend, incremental
+  python create_vectordb.py --backends faiss,export  # any combination of faiss, chroma, qdrant, export
+  python create_vectordb.py --rebuild                # ignore the manifests and start over
+  python create_vectordb.py --workers 8 --threads 4  # 8 embedding processes x 4 torch threads
+  python create_vectordb.py --no-cache               # bypass the shared embedding cache
+  python create_vectordb.py --export-format msgpack  # binary float32 export, ~5x smaller than JSON
+  python create_vectordb.py --faiss-index hnsw       # auto (by corpus size), flat, ivfflat, ivfpq or hnsw
+  python create_vectordb.py --faiss-index opq-ivfpq --faiss-eval-recall  # 32x smaller index, report recall@10
+  python create_vectordb.py --faiss-shards 8         # (re)build the FAISS index in 8 processes
+  python create_vectordb.py --chroma-profile high-recall  # fast-build, balanced, high-recall or low-memory HNSW
+  python create_vectordb.py --qdrant-url http://localhost:6333 --qdrant-quantization scalar --qdrant-on-disk
+
+The corpus is read, chunked and embedded once, and every selected backend is
+written in the same pass, each on its own thread. Each store keeps its own
+manifest, so only papers that are new or changed for at least one of them are
+embedded. Papers are streamed through in batches (--batch-size documents, at
+most --max-batch-mb of text), so memory stays bounded whatever the corpus size.
+Each paper is split into overlapping chunks that fit the model's sequence
+length (--chunk-tokens, --chunk-overlap); the stores hold one vector per chunk
+and the export one pooled vector per paper (--doc-vector mean|max).
+Chunk vectors are kept in an embedding cache shared by all builders
+(--cache, --cache-mb), so identical text is only ever encoded once. With
+--payload light the stores hold no chunk text; it is kept once, compressed,
+in a content store shared by all of them (see ``vectordb_content``).
+Query the stores with search_vectordb.py (see ``vectordb_search``).
+"""
+
+import argparse
+
+from sentence_transformers import SentenceTransformer
+
+from vectordb_backends import BACKENDS, STORE_MANIFESTS, EmbeddedBatch, StoreBackend, load_backend
+from vectordb_cache import EmbeddingCache
+from vectordb_chunking import Chunker, aggregate, group_by_parent, normalize
+from vectordb_common import (
+    CONTENT_PATH, add_build_arguments, batched, build_settings, check_build_arguments, iter_papers, list_papers,
+)
+from vectordb_content import ContentStore
+from vectordb_embed import Embedder
+from vectordb_manifest import light_versions
+
+# Configuration
+PAPERS_DIR = "./papers"  # Folder with your .txt files
+MODEL_NAME = 'all-MiniLM-L6-v2'  # Fast & good quality
+# Alternative: 'all-mpnet-base-v2' for better quality
+DEFAULT_BACKENDS = ",".join(BACKENDS)
+
+
+def finish(futures):
+    """Wait for backend calls and re-raise the first failure."""
+    for future in futures:
+        future.result()
+
+
+def main(default_backends=DEFAULT_BACKENDS, description="Build vector databases from a folder of papers"):
+    parser = argparse.ArgumentParser(description=description)
+    add_build_arguments(parser)
+    parser.add_argument("--backends", default=default_backends,
+                        help=f"comma-separated backends to write ({', '.join(BACKENDS)})")
+    args = parser.parse_args()
+
+    names = list(dict.fromkeys(name.strip() for name in args.backends.split(',') if name.strip()))
+    try:
+        check_build_arguments(args)
+        backends = [load_backend(name)(args, MODEL_NAME) for name in names]
+    except ImportError as exc:
+        parser.error(f"{exc}; install the client library of every selected backend")
+    except ValueError as exc:
+        parser.error(str(exc))
+    stores = [b for b in backends if isinstance(b, StoreBackend)]
+    export = next((b for b in backends if not isinstance(b, StoreBackend)), None)
+
+    filenames = list_papers(PAPERS_DIR)
+    if not filenames:
+        print("No .txt or .md files found!")
+        return
+
+    print(f"Scanning papers in {PAPERS_DIR}...")
+    settings = build_settings(args)
+    finish([b.submit("open", settings, PAPERS_DIR, filenames) for b in backends])
+    for store in stores:
+        print(f"  {store.label}: {store.plan.summary()}")
+
+    # The export is rewritten on every run (it may be missing or change format);
+    # with nothing to embed its vectors come from the stores, without the model
+    if stores and export is None and all(store.call("is_noop") for store in stores):
+        finish([store.submit("save") for store in stores])
+        for b in backends:
+            b.shutdown()
+        print("\n✅ Vector databases are up to date.")
+        return
+
+    # A paper is embedded once if any store needs it; the export alone needs every paper
+    to_embed = set().union(*(store.to_embed for store in stores)) if stores else set(filenames)
+
+    # Light payloads: the stores point into one shared, compressed copy of the texts
+    content = ContentStore(CONTENT_PATH) if args.payload == "light" and stores else None
+
+    embedder = chunker = None
+    if to_embed:
+        # Initialize embedding model (runs locally, no API needed)
+        print("Loading embedding model...")
+        model = SentenceTransformer(MODEL_NAME)
+        cache = EmbeddingCache.from_args(args, model, MODEL_NAME)
+        embedder = Embedder.create(model, MODEL_NAME, args.max_batch_tokens, args.workers, args.threads, cache)
+        chunker = Chunker.for_model(model, args.chunk_tokens, args.chunk_overlap)
+
+    # Stream the papers: new/changed ones are chunked and embedded here, then
+    # each backend writes the batch on its own thread while the next batch is
+    # embedded. Papers no store needed are only read for the export.
+    print("Processing papers...")
+    pending = []
+    to_read = filenames if export is not None else [f for f in filenames if f in to_embed]
+    papers = iter_papers(PAPERS_DIR, to_read, to_embed)
+    for batch in batched(papers, args.batch_size, int(args.max_batch_mb * 1024 * 1024)):
+        new = [p for p in batch if p.embed]
+        chunks, embeddings = {}, {}
+        if new:
+            if content is not None:
+                content.put(new)
+            flat = chunker.split_all(new)
+            # Unit vectors once for all backends (cosine = inner product)
+            vectors = normalize(embedder.encode_chunks(flat)).astype('float32')
+            chunks = group_by_parent(flat)
+            offset = 0
+            for paper in new:
+                n = len(chunks[paper.vector_id])
+                embeddings[paper.vector_id] = vectors[offset:offset + n]
+                offset += n
+                print(f"  Embedded: {paper.filename} ({n} chunks)")
+
+        # The stores must be idle before they are read back or written again
+        finish(pending)
+        doc_vectors = {}
+        if export is not None:
+            doc_vectors = {parent_id: aggregate(v, args.doc_vector) for parent_id, v in embeddings.items()}
+            kept = [p for p in batch if not p.embed]
+            if kept:
+                for parent_id, v in stores[0].call("stored_vectors", kept).items():
+                    doc_vectors[parent_id] = aggregate(v, args.doc_vector)
+
+        embedded = EmbeddedBatch(batch, chunks, embeddings, doc_vectors)
+        pending = [b.submit("write", embedded) for b in backends]
+    finish(pending)
+
+    finish([b.submit("close") for b in backends])
+    finish([store.submit("save") for store in stores])
+    if content is not None:
+        # Versions any light store still points at, whether or not it was written in this run
+        content.retain(set().union(*(light_versions(path) for path in STORE_MANIFESTS.values())))
+        content.close()
+    if embedder is not None:
+        embedder.close()
+
+    print("\n✅ Vector databases updated:")
+    for b in backends:
+        for line in b.call("report"):
+            print(f"   {line}")
+        b.shutdown()
+
+
+if __name__ == "__main__":
+    main()
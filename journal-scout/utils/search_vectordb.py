@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Search the vector databases built by create_vectordb.py
+Generated by Journal Scout
+
+Requirements:
+  pip install sentence-transformers
+  pip install faiss-cpu chromadb qdrant-client   # only the client of the backend you search
+
+Usage:
+  python search_vectordb.py "protein structure prediction"        # first built store: faiss, qdrant, chroma
+  python search_vectordb.py "attention" --backend qdrant --k 20
+  python search_vectordb.py "attention" --filter "year>=2020" --filter venue=Nature,Science
+  python search_vectordb.py "attention" --faiss-nprobe 32 --json  # hits as JSON
+  python search_vectordb.py --queries queries.txt --output hits.jsonl --no-text  # batch mode
+
+Every backend returns the same hits (see ``vectordb_search``), so a query
+can be compared across stores by rerunning it with another --backend.
+
+In batch mode every non-blank line of --queries is a query. Queries are
+encoded and searched a block at a time (--query-block, see
+``Searcher.search_many``) and written as they finish, one JSON object per line:
+{"index": <0-based line of the query in --queries>, "query": ..., "hits": [...]}.
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from vectordb_search import (
+    QUERY_BLOCK, add_search_arguments, built_backend, open_searcher, parse_filters, searcher_options,
+)
+
+SNIPPET_CHARS = 240  # chunk text shown per hit
+
+
+def print_hits(hits):
+    for rank, hit in enumerate(hits, 1):
+        print(f"{rank:>3}. {hit['score']:.3f}  {hit['title']}  [{hit['filename']}, chunk {hit['chunk']}]")
+        fields = hit["fields"]
+        if fields:
+            print("       " + ", ".join(f"{key}: {'; '.join(value) if isinstance(value, list) else value}"
+                                       for key, value in fields.items() if value != ""))
+        if hit["text"]:
+            snippet = " ".join(hit["text"].split())
+            print(f"       {snippet[:SNIPPET_CHARS]}{'...' if len(snippet) > SNIPPET_CHARS else ''}")
+
+
+def read_queries(path):
+    """``(line_number, query)`` for the non-blank lines of ``path``, 0-based."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f):
+            if line.strip():
+                yield line_number, line.strip()
+
+
+def search_file(searcher, args, filters):
+    """Stream the hits of every query in ``args.queries`` to ``args.output`` as JSON lines."""
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    start = time.perf_counter()
+    count = 0
+    try:
+        results = searcher.search_many(read_queries(args.queries), args.k, filters, args.query_block,
+                                       not args.no_text, keyed=True)
+        for count, (line_number, query, hits) in enumerate(results, 1):
+            out.write(json.dumps({"index": line_number, "query": query, "hits": hits}, ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    seconds = time.perf_counter() - start
+    print(f"✅ {count} queries in {seconds:.1f} s ({count / max(seconds, 1e-9):.0f} queries/s)"
+          f"{f', hits written to {args.output}' if args.output else ''}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the vector databases built from a folder of papers")
+    parser.add_argument("query", nargs="?", help="text to search for")
+    add_search_arguments(parser)
+    parser.add_argument("--json", action="store_true", help="print the hits as JSON")
+    batch = parser.add_argument_group("batch mode")
+    batch.add_argument("--queries", help="file with one query per line, searched in blocks instead of QUERY")
+    batch.add_argument("--output", help="JSON lines file for the hits of --queries (default: stdout)")
+    batch.add_argument("--query-block", type=int, default=QUERY_BLOCK, help="queries encoded and searched together")
+    batch.add_argument("--no-text", action="store_true", help="leave the chunk text out of the hits")
+    args = parser.parse_args()
+    if (args.query is None) == (args.queries is None):
+        parser.error("give either a query or --queries")
+
+    try:
+        filters = parse_filters(args.filter)
+        backend = built_backend() if args.backend == "auto" else args.backend
+    except (ValueError, FileNotFoundError) as exc:
+        parser.error(str(exc))
+    searcher = open_searcher(backend, **searcher_options(args, backend))
+    try:
+        if args.queries:
+            search_file(searcher, args, filters)
+            return
+        hits = searcher.search(args.query, args.k, filters)
+    finally:
+        searcher.close()
+
+    if args.json:
+        print(json.dumps(hits, indent=1, ensure_ascii=False))
+        return
+    print(f"{len(hits)} hits from {backend} for {args.query!r}"
+          f"{f' with {filters}' if filters else ''}:")
+    print_hits(hits)
+
+
+if __name__ == "__main__":
+    main()
@@ -407,6 +407,30 @@ export interface ImportResult {
   fileFormat: 'json' | 'msgpack';
 }
 
+/**
+ * Expand binary embeddings into number arrays.
+ * MessagePack exports from the Python builders store each embedding as packed
+ * little-endian float32 bytes and mark it with embeddingEncoding: 'float32le'
+ */
+const decodeBinaryEmbeddings = (data: any): any => {
+  if (data?.embeddingEncoding !== 'float32le' || !Array.isArray(data.documents)) {
+    return data;
+  }
+  for (const doc of data.documents) {
+    if (doc.embedding instanceof Uint8Array) {
+      const bytes: Uint8Array = doc.embedding;
+      const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+      const embedding = new Array<number>(bytes.byteLength / 4);
+      for (let i = 0; i < embedding.length; i++) {
+        embedding[i] = view.getFloat32(i * 4, true);
+      }
+      doc.embedding = embedding;
+    }
+  }
+  delete data.embeddingEncoding;
+  return data;
+};
+
 /**
  * Import a vector database from file content
  * Handles all vector DB formats: ChromaDB, FAISS, Qdrant, Pinecone, Weaviate, Milvus, LanceDB
@@ -423,7 +447,7 @@ export const importVectorDB = (content: string | ArrayBuffer): ImportResult => {
     // Try MessagePack decode
     try {
       const { decode } = require('@msgpack/msgpack');
-      data = decode(new Uint8Array(content));
+      data = decodeBinaryEmbeddings(decode(new Uint8Array(content)));
       fileFormat = 'msgpack';
     } catch {
       // Try as JSON string from ArrayBuffer
@@ -0,0 +1,190 @@
+"""
+Pluggable destinations of the vector database builder.
+
+The corpus is read, chunked and embedded once per run; every selected backend
+(FAISS, Chroma, Qdrant, the Journal Scout export) then receives the same
+``EmbeddedBatch``. Each backend runs on its own thread, so the writers work
+concurrently with each other and with the embedding of the next batch.
+
+Store backends keep their own manifest: a paper is embedded when at least one
+of them needs it, and each store only writes the papers in its own plan.
+"""
+
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from vectordb_common import EXPORT_WRITERS
+from vectordb_manifest import Manifest
+
+# name -> (module, class); modules are imported on demand so only the
+# client libraries of the selected backends need to be installed
+BACKENDS = {
+    "faiss": ("vectordb_faiss", "FaissBackend"),
+    "chroma": ("vectordb_chroma", "ChromaBackend"),
+    "qdrant": ("vectordb_qdrant", "QdrantBackend"),
+    "export": ("vectordb_backends", "ExportBackend"),
+}
+
+# Manifest of each store; the content store keeps every paper version these record
+STORE_MANIFESTS = {
+    "faiss": "papers_vectordb_manifest.json",
+    "chroma": "papers_vectordb_chroma_manifest.json",
+    "qdrant": "papers_vectordb_qdrant_manifest.json",
+}
+
+EXPORT_NAME = "papers_vectordb"
+
+
+def load_backend(name):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}; expected one of {', '.join(BACKENDS)}")
+    module, cls = BACKENDS[name]
+    return getattr(importlib.import_module(module), cls)
+
+
+class EmbeddedBatch:
+    """One batch of papers with the chunks and vectors computed for it.
+
+    ``chunks`` and ``embeddings`` map parent id -> chunks / (n_chunks, dim)
+    float32 unit vectors, for the papers embedded in this run. ``doc_vectors``
+    maps parent id -> pooled document vector for every paper of the batch and
+    is only filled when the export is selected.
+    """
+
+    __slots__ = ("papers", "chunks", "embeddings", "doc_vectors")
+
+    def __init__(self, papers, chunks, embeddings, doc_vectors=None):
+        self.papers = papers
+        self.chunks = chunks
+        self.embeddings = embeddings
+        self.doc_vectors = doc_vectors or {}
+
+
+class Backend:
+    """A destination of the build; every call runs on the backend's own thread."""
+
+    name = None
+    label = None
+
+    def __init__(self, args, model_name):
+        self.args = args
+        self.model_name = model_name
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"backend-{self.name}")
+
+    def submit(self, method, *args):
+        return self._executor.submit(getattr(self, method), *args)
+
+    def call(self, method, *args):
+        return self.submit(method, *args).result()
+
+    def open(self, settings, papers_dir, filenames):
+        pass
+
+    def write(self, batch):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def report(self):
+        """Lines printed once the build is done."""
+        return []
+
+    def shutdown(self):
+        self._executor.shutdown()
+
+
+class StoreBackend(Backend):
+    """A vector store that keeps a manifest and is updated incrementally.
+
+    Subclasses implement ``connect`` (open the store, return the manifest to
+    trust), ``remove`` (delete chunk vectors by id), ``add`` (store the chunks
+    of new/changed papers), ``stored_vectors`` (read chunk vectors back) and
+    ``count``.
+    """
+
+    manifest_path = None
+
+    def __init__(self, args, model_name):
+        super().__init__(args, model_name)
+        self.manifest = None
+        self.plan = None
+        self.to_embed = set()
+
+    def new_manifest(self, settings):
+        return Manifest(self.manifest_path, self.model_name, settings)
+
+    def open(self, settings, papers_dir, filenames):
+        if self.args.rebuild:
+            manifest = self.new_manifest(settings)
+        else:
+            manifest = Manifest.load(self.manifest_path, self.model_name, settings)
+        self.manifest = self.connect(manifest, settings)
+        self.plan = self.manifest.plan(papers_dir, filenames)
+        self.to_embed = set(self.plan.to_embed)
+
+        # Drop chunk vectors of changed and removed papers; changed ones are re-added
+        stale_ids = self.plan.stale_ids(self.manifest)
+        if stale_ids:
+            self.remove(stale_ids)
+        self.manifest.forget(self.plan.removed)
+
+    def connect(self, manifest, settings):
+        raise NotImplementedError
+
+    def remove(self, chunk_ids):
+        raise NotImplementedError
+
+    def add(self, papers, chunks, embeddings):
+        """Store ``chunks`` (a flat list) with their ``embeddings`` matrix."""
+        raise NotImplementedError
+
+    def stored_vectors(self, papers):
+        """Map parent id -> chunk vectors of papers this store already holds."""
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+    def write(self, batch):
+        new = [p for p in batch.papers if p.filename in self.to_embed]
+        if new:
+            chunks = [c for p in new for c in batch.chunks[p.vector_id]]
+            embeddings = np.concatenate([batch.embeddings[p.vector_id] for p in new])
+            self.add(new, chunks, embeddings)
+            for paper in new:
+                self.manifest.record(self.plan, paper.filename, paper.vector_id, batch.chunks[paper.vector_id])
+
+    def is_noop(self):
+        """True when this run has nothing to change in the store."""
+        return self.plan.is_noop()
+
+    def save(self):
+        self.manifest.save()
+
+    def report(self):
+        return [f"{self.label}: {len(self.manifest.entries)} documents, {self.count()} chunks "
+                f"({self.plan.summary()})", f"   Manifest: {self.manifest_path}"]
+
+
+class ExportBackend(Backend):
+    """The Journal Scout export: one pooled vector per paper."""
+
+    name = "export"
+    label = "Journal Scout export"
+
+    def open(self, settings, papers_dir, filenames):
+        fmt = self.args.export_format
+        self.writer = EXPORT_WRITERS[fmt](f"{EXPORT_NAME}_export.{fmt}", EXPORT_NAME)
+
+    def write(self, batch):
+        for paper in batch.papers:
+            self.writer.write(paper, batch.doc_vectors[paper.vector_id])
+
+    def close(self):
+        self.writer.close()
+
+    def report(self):
+        return [f"Exported: {self.writer.path} ({self.writer.count} documents, for Journal Scout import)"]
@@ -0,0 +1,121 @@
+"""
+On-disk embedding cache shared by the vector database builders.
+
+Switching between the FAISS, Chroma and Qdrant builders, or rerunning one
+after a crash, would otherwise re-embed identical chunk text. Vectors are kept
+in a SQLite file keyed by a hash of (model id + revision, normalization, chunk
+text) and stored as raw float32 bytes. The file is capped in size; the least
+recently used vectors are evicted first.
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from vectordb_common import CACHE_MB
+
+# Vectors are cached exactly as model.encode returns them (the builders normalize afterwards)
+NORMALIZATION = "raw"
+
+
+def model_fingerprint(model, model_name):
+    """Model id plus the hub revision it was loaded from, when one can be found.
+
+    Models loaded from the Hugging Face cache live under ``snapshots/<commit>``,
+    so a model update upstream yields a different fingerprint.
+    """
+    try:
+        path = model[0].auto_model.config._name_or_path
+    except (AttributeError, IndexError, KeyError, TypeError):
+        return model_name
+    parts = path.replace(os.sep, '/').rstrip('/').split('/')
+    if len(parts) >= 2 and parts[-2] == "snapshots":
+        return f"{model_name}@{parts[-1]}"
+    return model_name
+
+
+class EmbeddingCache:
+    """Size-bounded LRU map from chunk text to its float32 vector."""
+
+    def __init__(self, path, model_key, max_mb=CACHE_MB, normalization=NORMALIZATION):
+        self.path = path
+        self.model_key = model_key
+        self.normalization = normalization
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS vectors ("
+            " key BLOB PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS vectors_last_used ON vectors(last_used)")
+        self._db.commit()
+        self._size = self._db.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM vectors").fetchone()[0]
+
+    @classmethod
+    def from_args(cls, args, model, model_name):
+        """Cache configured by the builder options, or None with ``--no-cache``."""
+        if args.no_cache:
+            return None
+        return cls(args.cache, model_fingerprint(model, model_name), args.cache_mb)
+
+    def key(self, text):
+        digest = hashlib.sha256()
+        for part in (self.model_key, self.normalization, text):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.digest()[:16]
+
+    def get_many(self, keys):
+        """Map key -> vector for the ``keys`` that are cached; hits are marked as used."""
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        for start in range(0, len(unique), 500):  # stay under SQLite's bound-parameter limit
+            part = unique[start:start + 500]
+            rows = self._db.execute(
+                f"SELECT key, vector FROM vectors WHERE key IN ({','.join('?' * len(part))})", part
+            )
+            for key, blob in rows:
+                found[bytes(key)] = np.frombuffer(blob, dtype='float32')
+        if found:
+            now = time.time()
+            self._db.executemany("UPDATE vectors SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+            self._db.commit()
+        self.hits += sum(1 for k in keys if k in found)
+        self.misses += sum(1 for k in keys if k not in found)
+        return found
+
+    def put_many(self, keys, vectors):
+        now = time.time()
+        rows = [(key, np.ascontiguousarray(vector, dtype='float32').tobytes(), now) for key, vector in zip(keys, vectors)]
+        self._db.executemany("INSERT OR REPLACE INTO vectors (key, vector, last_used) VALUES (?, ?, ?)", rows)
+        self._size += sum(len(blob) for _, blob, _ in rows)
+        if self._size > self.max_bytes:
+            self._evict()
+        self._db.commit()
+
+    def _evict(self):
+        """Drop least recently used vectors until the cache is back under 90% of its cap."""
+        self._size = self._db.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM vectors").fetchone()[0]
+        target = int(self.max_bytes * 0.9)
+        rows = self._db.execute("SELECT key, LENGTH(vector) FROM vectors ORDER BY last_used")
+        doomed = []
+        for key, size in rows:
+            if self._size <= target:
+                break
+            doomed.append((key,))
+            self._size -= size
+        self._db.executemany("DELETE FROM vectors WHERE key = ?", doomed)
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        return (f"{self.hits} hits, {self.misses} misses ({rate:.0%} hit rate), "
+                f"{self._size / (1024 * 1024):.1f} MB in {self.path}")
+
+    def close(self):
+        self._db.close()
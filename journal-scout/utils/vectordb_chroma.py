@@ -0,0 +1,176 @@
+"""
+ChromaDB backend of the vector database builder.
+
+Requirements:
+  pip install chromadb
+
+The collection holds one entry per chunk (text, vector and metadata; no text
+with --payload light, see ``vectordb_content``), keyed by ``chunk_<id>``, in a
+persistent client under ``DB_DIR``. Writes are upserts of at most the
+client's maximum batch size (and ``UPSERT_BATCH``), converted to Python lists
+one slice at a time, so reruns overwrite rather than fail and no call
+outgrows what Chroma accepts.
+
+The HNSW graph is configured by a named profile (--chroma-profile, see
+``CHROMA_PROFILES``); the graph cannot be reconfigured in place, so changing
+the profile starts the collection over.
+
+Entries carry the paper's extracted fields (year, venue, authors, category,
+folder; see ``extract_fields``) as metadata, which Chroma indexes, so a
+``chroma_where`` clause filters before the vector search. ``ChromaSearcher``
+answers the queries of a search in one query call (see ``vectordb_search``).
+"""
+
+import os
+import time
+
+import chromadb
+
+from vectordb_backends import STORE_MANIFESTS, StoreBackend
+from vectordb_common import CHROMA_PROFILES, MAX_BATCH_TOKENS, chunk_key, chunk_key_id
+from vectordb_search import Searcher, make_hit
+
+AUTHOR_SEPARATOR = "; "  # Chroma metadata values are scalars: authors are stored joined
+AUTHOR_KEY = "author:{}"  # plus one True flag per author, so a filter can match each name
+
+DB_DIR = "./vectordb"    # Where to store the vector database
+COLLECTION_NAME = "papers_vectordb"
+UPSERT_BATCH = 5_000     # chunks per upsert/delete/get, further capped by the client's max batch size
+
+
+def chroma_metadata(paper, chunk):
+    metadata = {"filename": paper.filename, "title": paper.title, "sha256": paper.sha256, **chunk.metadata()}
+    for key, value in paper.fields.items():
+        metadata[key] = AUTHOR_SEPARATOR.join(value) if key == "authors" else value
+    for author in paper.fields.get("authors", ()):
+        metadata[AUTHOR_KEY.format(author)] = True
+    return metadata
+
+
+def chroma_where(filters):
+    """Chroma ``where`` clause for ``{field: value | [any of values] | {"gte": .., "lte": ..}}``, or None.
+
+    Authors are matched on their per-author flags, so a paper matches any one of its authors.
+    """
+    clauses = []
+    for key, value in (filters or {}).items():
+        if key == "authors":
+            names = list(value) if isinstance(value, (list, tuple, set)) else [value]
+            flags = [{AUTHOR_KEY.format(name): {"$eq": True}} for name in names]
+            clauses.append(flags[0] if len(flags) == 1 else {"$or": flags})
+        elif isinstance(value, dict):
+            clauses.extend({key: {f"${op}": bound}} for op, bound in value.items())
+        elif isinstance(value, (list, tuple, set)):
+            clauses.append({key: {"$in": list(value)}})
+        else:
+            clauses.append({key: {"$eq": value}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+class ChromaBackend(StoreBackend):
+    name = "chroma"
+    label = "Chroma collection"
+    manifest_path = STORE_MANIFESTS["chroma"]
+
+    def collection_metadata(self):
+        metadata = {"hnsw:space": "cosine"}
+        metadata.update({f"hnsw:{key}": value for key, value in CHROMA_PROFILES[self.args.chroma_profile].items()})
+        if self.args.chroma_threads:
+            metadata["hnsw:num_threads"] = self.args.chroma_threads
+        return metadata
+
+    def connect(self, manifest, settings):
+        print(f"Initializing ChromaDB ({self.args.chroma_profile} HNSW profile)...")
+        self.client = chromadb.PersistentClient(path=DB_DIR)
+        self.write_seconds = 0.0
+        metadata = self.collection_metadata()
+
+        if not manifest.is_empty():
+            try:
+                existing = self.client.get_collection(COLLECTION_NAME).metadata or {}
+            except Exception:
+                existing = {}
+            # The thread count only affects build speed, not the graph
+            if any(existing.get(key) != value for key, value in metadata.items() if key != "hnsw:num_threads"):
+                print("  HNSW settings changed: rebuilding the collection")
+                manifest = self.new_manifest(settings)
+        if manifest.is_empty():
+            # Nothing we can trust in an existing collection: start from a clean one
+            try:
+                self.client.delete_collection(COLLECTION_NAME)
+            except Exception:
+                pass  # first run, no collection yet
+
+        self.collection = self.client.get_or_create_collection(name=COLLECTION_NAME, metadata=metadata)
+        if self.collection.count() == 0:
+            manifest = self.new_manifest(settings)  # collection was wiped: re-embed everything
+        self.batch_size = min(UPSERT_BATCH, self.client.get_max_batch_size())
+        return manifest
+
+    def slices(self, n):
+        return (slice(start, start + self.batch_size) for start in range(0, n, self.batch_size))
+
+    def remove(self, chunk_ids):
+        keys = [chunk_key(i) for i in chunk_ids]
+        for part in self.slices(len(keys)):
+            self.collection.delete(ids=keys[part])
+
+    def add(self, papers, chunks, embeddings):
+        start = time.perf_counter()
+        papers_by_id = {p.vector_id: p for p in papers}
+        for part in self.slices(len(chunks)):
+            self.collection.upsert(
+                documents=[c.text for c in chunks[part]] if self.args.payload == "full" else None,
+                embeddings=embeddings[part].tolist(),
+                metadatas=[chroma_metadata(papers_by_id[c.parent_id], c) for c in chunks[part]],
+                ids=[chunk_key(c.chunk_id) for c in chunks[part]]
+            )
+        self.write_seconds += time.perf_counter() - start
+
+    def stored_vectors(self, papers):
+        ids = {paper.vector_id: [chunk_key(i) for i in self.manifest.chunk_ids(paper.filename)] for paper in papers}
+        keys = [key for keys in ids.values() for key in keys]
+        stored = {}
+        for part in self.slices(len(keys)):
+            found = self.collection.get(ids=keys[part], include=["embeddings"])
+            stored.update(zip(found["ids"], found["embeddings"]))
+        return {vector_id: [stored[key] for key in keys] for vector_id, keys in ids.items()}
+
+    def count(self):
+        return self.collection.count()
+
+    def report(self):
+        size_mb = sum(os.path.getsize(os.path.join(root, name))
+                      for root, _, names in os.walk(DB_DIR) for name in names) / (1024 * 1024)
+        profile = CHROMA_PROFILES[self.args.chroma_profile]
+        return super().report() + [
+            f"   HNSW: {self.args.chroma_profile} (M={profile['M']}, construction_ef={profile['construction_ef']}, "
+            f"search_ef={profile['search_ef']}), {self.write_seconds:.1f} s writing this run",
+            f"   Location: {DB_DIR} ({size_mb:.1f} MB)",
+        ]
+
+
+class ChromaSearcher(Searcher):
+    name = "chroma"
+    manifest_path = ChromaBackend.manifest_path
+
+    def __init__(self, model=None, max_batch_tokens=MAX_BATCH_TOKENS):
+        super().__init__(model, max_batch_tokens)
+        self.collection = chromadb.PersistentClient(path=DB_DIR).get_collection(COLLECTION_NAME)
+
+    def search_vectors(self, vectors, k, filters=None):
+        result = self.collection.query(query_embeddings=vectors.tolist(), n_results=k, where=chroma_where(filters),
+                                       include=["metadatas", "documents", "distances"])
+        results = []
+        for keys, metadatas, documents, distances in zip(result["ids"], result["metadatas"],
+                                                         result["documents"], result["distances"]):
+            hits = []
+            for key, metadata, document, distance in zip(keys, metadatas, documents, distances):
+                if "authors" in metadata:
+                    metadata = {**metadata, "authors": metadata["authors"].split(AUTHOR_SEPARATOR)}
+                # Cosine space: distance = 1 - similarity
+                hits.append(make_hit(chunk_key_id(key), 1 - distance, metadata, document))
+            results.append(hits)
+        return results
@@ -0,0 +1,99 @@
+"""
+Token-aware chunking ahead of ``model.encode``.
+
+Sentence-transformer models silently truncate their input (all-MiniLM-L6-v2 at
+256 word pieces), so embedding a whole paper throws away everything after the
+abstract. Papers are split into windows of at most ``max_tokens`` tokens that
+overlap by ``overlap`` tokens; every window is embedded on its own and keeps
+its parent document id and character offsets. A document-level vector for
+the Journal Scout export is aggregated from the chunk vectors.
+"""
+
+import numpy as np
+
+from vectordb_common import CHUNK_OVERLAP, chunk_id
+
+
+class Chunk:
+    """A window of a paper; ``start``/``end`` are character offsets into its content."""
+
+    __slots__ = ("chunk_id", "parent_id", "index", "start", "end", "text", "n_tokens")
+
+    def __init__(self, parent_id, index, start, end, text, n_tokens):
+        self.chunk_id = chunk_id(parent_id, index)
+        self.parent_id = parent_id
+        self.index = index
+        self.start = start
+        self.end = end
+        self.text = text
+        self.n_tokens = n_tokens
+
+    def metadata(self):
+        return {"parent_id": self.parent_id, "chunk": self.index, "start": self.start, "end": self.end}
+
+
+class Chunker:
+    """Split text by tokenizer length with a fixed token overlap."""
+
+    def __init__(self, tokenizer, max_tokens, overlap=CHUNK_OVERLAP):
+        if not 0 <= overlap < max_tokens:
+            raise ValueError(f"overlap ({overlap}) must be smaller than max_tokens ({max_tokens})")
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.overlap = overlap
+
+    @classmethod
+    def for_model(cls, model, max_tokens=None, overlap=CHUNK_OVERLAP):
+        """Size chunks to the model's sequence limit, leaving room for [CLS]/[SEP]."""
+        return cls(model.tokenizer, max_tokens or model.max_seq_length - 2, overlap)
+
+    def split(self, paper):
+        text = paper.content
+        offsets = self.tokenizer(
+            text,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+            verbose=False,
+        )["offset_mapping"]
+        if not offsets:
+            return [Chunk(paper.vector_id, 0, 0, len(text), text, 0)]
+
+        chunks = []
+        step = self.max_tokens - self.overlap
+        for first in range(0, len(offsets), step):
+            window = offsets[first:first + self.max_tokens]
+            start, end = window[0][0], window[-1][1]
+            chunks.append(Chunk(paper.vector_id, len(chunks), start, end, text[start:end], len(window)))
+            if first + self.max_tokens >= len(offsets):
+                break
+        return chunks
+
+    def split_all(self, papers):
+        return [chunk for paper in papers for chunk in self.split(paper)]
+
+
+def normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def aggregate(vectors, mode="mean"):
+    """Document-level vector from its chunk vectors (unit length)."""
+    vectors = np.asarray(vectors, dtype='float32')
+    if mode == "mean":
+        pooled = vectors.mean(axis=0)
+    elif mode == "max":
+        pooled = vectors.max(axis=0)
+    else:
+        raise ValueError(f"Unknown document vector mode {mode!r}; expected 'mean' or 'max'")
+    return normalize(pooled).astype('float32')
+
+
+def group_by_parent(chunks):
+    """Map parent id -> its chunks, in chunk order."""
+    groups = {}
+    for chunk in chunks:
+        groups.setdefault(chunk.parent_id, []).append(chunk)
+    return groups
@@ -0,0 +1,417 @@
+"""
+Helpers shared by the vector database builders.
+"""
+
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from datetime import datetime
+
+import numpy as np
+
+# Ids are kept below 2**63 so they fit FAISS int64 ids and Qdrant unsigned ids alike
+ID_MASK = (1 << 63) - 1
+
+
+def normalize_path(relpath):
+    """Canonical form of a path relative to the papers folder."""
+    relpath = unicodedata.normalize('NFC', relpath.replace(os.sep, '/'))
+    while relpath.startswith('./'):
+        relpath = relpath[2:]
+    return relpath
+
+
+def doc_id(relpath):
+    """Stable 63-bit id of a paper, derived from its normalized relative path.
+
+    The id does not depend on listing order, so adding a paper never renumbers
+    the others and an edited paper keeps its id (its vector is replaced in place).
+    """
+    digest = hashlib.blake2b(normalize_path(relpath).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') & ID_MASK
+
+
+def chunk_id(parent_id, index):
+    """Stable 63-bit id of the ``index``-th chunk of a document."""
+    digest = hashlib.blake2b(f"{parent_id}:{index}".encode('ascii'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') & ID_MASK
+
+
+def export_id(vector_id):
+    """Document id used by the Journal Scout export."""
+    return f"doc_{vector_id}"
+
+
+def chunk_key(vector_id):
+    """String id of a chunk in stores that key by string (Chroma)."""
+    return f"chunk_{vector_id}"
+
+
+def chunk_key_id(key):
+    """Chunk id of a ``chunk_key``."""
+    return int(key.split('_', 1)[1])
+
+
+# Command line options shared by the builders
+
+BATCH_SIZE = 256     # documents per batch
+MAX_BATCH_MB = 64    # text held in memory per batch
+CHUNK_OVERLAP = 32   # tokens shared by consecutive chunks
+MAX_BATCH_TOKENS = 16384  # padded tokens per model.encode call
+CACHE_PATH = "./embedding_cache.sqlite"  # embedding cache shared by all builders
+CACHE_MB = 1024      # size cap of the embedding cache
+CONTENT_PATH = "./papers_content.sqlite"  # paper texts shared by the stores with --payload light
+PAYLOAD_MODES = ("full", "light")
+EXPORT_FORMATS = ("json", "msgpack")
+EMBEDDING_ENCODING = "float32le"  # binary embeddings of the msgpack export
+FAISS_INDEX_TYPES = ("auto", "flat", "ivfflat", "ivfpq", "hnsw", "opq-ivfpq", "ivfsq8", "ivfsq4")
+QDRANT_BATCH = 256  # points per Qdrant upload request
+QDRANT_QUANTIZATION = ("none", "scalar", "binary")
+# HNSW settings of the Chroma collection: build cost vs query recall vs memory
+CHROMA_PROFILES = {
+    "fast-build": {"M": 12, "construction_ef": 64, "search_ef": 40},
+    "balanced": {"M": 16, "construction_ef": 128, "search_ef": 64},
+    "high-recall": {"M": 32, "construction_ef": 256, "search_ef": 160},
+    "low-memory": {"M": 8, "construction_ef": 96, "search_ef": 64},
+}
+
+
+def add_build_arguments(parser):
+    parser.add_argument("--rebuild", action="store_true", help="ignore the manifest and re-embed every paper")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="documents per batch")
+    parser.add_argument("--max-batch-mb", type=float, default=MAX_BATCH_MB, help="memory ceiling for the text of one batch")
+    parser.add_argument("--max-batch-tokens", type=int, default=MAX_BATCH_TOKENS,
+                        help="padded token budget of one model.encode call (texts are length-sorted)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="embedding worker processes, each with its own model replica (1 = in-process)")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="torch threads per worker (default: cores / workers)")
+    parser.add_argument("--cache", default=CACHE_PATH, help="embedding cache file shared by the builders")
+    parser.add_argument("--cache-mb", type=float, default=CACHE_MB, help="size cap of the embedding cache (LRU eviction)")
+    parser.add_argument("--no-cache", action="store_true", help="embed every chunk without reading or filling the cache")
+    parser.add_argument("--chunk-tokens", type=int, default=None,
+                        help="tokens per chunk (default: the model's max sequence length)")
+    parser.add_argument("--chunk-overlap", type=int, default=CHUNK_OVERLAP, help="tokens shared by consecutive chunks")
+    parser.add_argument("--payload", choices=PAYLOAD_MODES, default="full",
+                        help="full: every store keeps its chunk texts; light: stores keep title, filename and "
+                             f"offsets, texts are stored once, compressed, in {CONTENT_PATH}")
+    parser.add_argument("--export-format", choices=EXPORT_FORMATS, default="json",
+                        help="Journal Scout export as JSON or as MessagePack with binary float32 embeddings")
+    parser.add_argument("--doc-vector", choices=("mean", "max"), default="mean",
+                        help="how chunk vectors are pooled into the document vector of the export")
+
+    faiss_group = parser.add_argument_group("FAISS backend")
+    faiss_group.add_argument("--faiss-index", choices=FAISS_INDEX_TYPES, default="auto",
+                             help="index type (auto: flat under 50k chunks, HNSW up to 1M, IVF beyond); "
+                                  "opq-ivfpq, ivfpq, ivfsq4 and ivfsq8 compress vectors 32x/16x/8x/4x")
+    faiss_group.add_argument("--faiss-nlist", type=int, default=None, help="IVF lists (default: ~4 sqrt(chunks))")
+    faiss_group.add_argument("--faiss-pq-m", type=int, default=None,
+                             help="PQ sub-quantizers, one byte each (default: dimension / 4, or / 8 with OPQ)")
+    faiss_group.add_argument("--faiss-hnsw-m", type=int, default=None, help="HNSW neighbours per node (default: 16 or 32 by size)")
+    faiss_group.add_argument("--faiss-ef-construction", type=int, default=None, help="HNSW efConstruction (default: 80 or 160 by size)")
+    faiss_group.add_argument("--faiss-shards", type=int, default=1,
+                             help="(re)build the index in this many processes, split by chunk id; flat and IVF "
+                                  "shards are merged, HNSW shards are kept and searched together")
+    faiss_group.add_argument("--faiss-eval-recall", action="store_true",
+                             help="after building an approximate index, report recall@10 against exact search")
+
+    qdrant_group = parser.add_argument_group("Qdrant backend")
+    qdrant_group.add_argument("--qdrant-url", default=None,
+                              help="Qdrant server to write to (API key from QDRANT_API_KEY; default: local ./qdrant_db)")
+    qdrant_group.add_argument("--qdrant-workers", type=int, default=4,
+                              help="parallel upload threads (a server only; local storage takes one writer)")
+    qdrant_group.add_argument("--qdrant-batch", type=int, default=QDRANT_BATCH, help="points per upload request")
+    qdrant_group.add_argument("--qdrant-quantization", choices=QDRANT_QUANTIZATION, default="none",
+                              help="keep int8 (scalar, 4x smaller) or 1-bit (binary, 32x) copies of the vectors in RAM")
+    qdrant_group.add_argument("--qdrant-on-disk", action="store_true",
+                              help="store the original vectors and the payload on disk (memory-mapped)")
+    qdrant_group.add_argument("--qdrant-hnsw-m", type=int, default=None, help="HNSW m (Qdrant default: 16)")
+    qdrant_group.add_argument("--qdrant-ef-construct", type=int, default=None, help="HNSW ef_construct (Qdrant default: 100)")
+
+    chroma_group = parser.add_argument_group("Chroma backend")
+    chroma_group.add_argument("--chroma-profile", choices=tuple(CHROMA_PROFILES), default="balanced",
+                              help="HNSW M / construction_ef / search_ef of the collection ("
+                                   + "; ".join(f"{name}: {p['M']}/{p['construction_ef']}/{p['search_ef']}"
+                                               for name, p in CHROMA_PROFILES.items()) + ")")
+    chroma_group.add_argument("--chroma-threads", type=int, default=None,
+                              help="threads Chroma uses to build the graph (default: all cores)")
+    return parser
+
+
+def check_build_arguments(args):
+    """Reject option combinations before any store is opened (opening a store may already delete from it)."""
+    if args.chunk_overlap < 0:
+        raise ValueError(f"--chunk-overlap ({args.chunk_overlap}) must not be negative")
+    if args.chunk_tokens is not None and not args.chunk_overlap < args.chunk_tokens:
+        raise ValueError(f"--chunk-overlap ({args.chunk_overlap}) must be smaller than --chunk-tokens ({args.chunk_tokens})")
+
+
+def build_settings(args):
+    """Options that change the stored vectors or payloads; a change forces a rebuild."""
+    settings = {"chunk_tokens": args.chunk_tokens, "chunk_overlap": args.chunk_overlap}
+    if args.payload != "full":
+        settings["payload"] = args.payload  # absent for full payloads, so older manifests stay valid
+    return settings
+
+
+# Corpus streaming
+# Papers flow through the builders as walk -> read -> extract title -> batch,
+# so only one batch of text (bounded by count and bytes) is held at a time.
+
+PAPER_EXTENSIONS = ('.txt', '.md')
+
+
+# Structured fields extracted at ingest, with the payload index type they get
+FILTER_FIELDS = {"year": "integer", "venue": "keyword", "authors": "keyword", "category": "keyword",
+                 "folder": "keyword", "filename": "keyword"}
+FIELDS_HEAD = 4000  # characters of a paper searched for its fields
+
+
+def check_filters(filters):
+    """Raise ValueError unless ``filters`` only names ``FILTER_FIELDS``.
+
+    A filter maps a field to a value, a list of values (any of them) or, for
+    an integer field, a range ``{"gte": low, "lte": high}`` (either bound
+    optional).
+    """
+    for key, value in (filters or {}).items():
+        if key not in FILTER_FIELDS:
+            raise ValueError(f"Cannot filter on {key!r}; expected one of {', '.join(FILTER_FIELDS)}")
+        if isinstance(value, dict) and FILTER_FIELDS[key] != "integer":
+            raise ValueError(f"Range filters need an integer field; {key!r} is a {FILTER_FIELDS[key]} field")
+        if isinstance(value, dict) and (not value or set(value) - {"gte", "lte"}):
+            raise ValueError(f"Range filter on {key!r} takes 'gte' and/or 'lte', got {sorted(value)}")
+
+
+class Paper:
+    """One paper read from disk; ``embed`` is False when its vector is already stored.
+
+    ``sha256`` is the hash of the file's bytes, as the manifests record it.
+    """
+
+    __slots__ = ("filename", "content", "title", "vector_id", "embed", "fields", "sha256")
+
+    def __init__(self, filename, content, title, vector_id, embed=True, fields=None, sha256=None):
+        self.filename = filename
+        self.content = content
+        self.title = title
+        self.vector_id = vector_id
+        self.embed = embed
+        self.fields = fields or {}
+        self.sha256 = sha256
+
+
+def list_papers(papers_dir):
+    """Normalized relative paths of every paper below ``papers_dir``, sorted."""
+    filenames = []
+    for root, dirs, files in os.walk(papers_dir):
+        dirs.sort()
+        for name in files:
+            if name.endswith(PAPER_EXTENSIONS):
+                filenames.append(normalize_path(os.path.relpath(os.path.join(root, name), papers_dir)))
+    return sorted(filenames)
+
+
+def extract_title(content, filename):
+    title = os.path.basename(filename)
+    if 'TITLE:' in content:
+        title = content.split('TITLE:')[1].split('\n')[0].strip()
+    return title
+
+
+def _header(head, *names):
+    match = re.search(rf"^(?:{'|'.join(names)}):[ \t]*(.+)$", head, re.IGNORECASE | re.MULTILINE)
+    return match.group(1).strip() if match else None
+
+
+def extract_fields(content, filename):
+    """Filterable fields of a paper: year, venue, authors, arXiv category and source folder.
+
+    Read from the header lines Journal Scout writes (``AUTHORS:``, ``JOURNAL:
+    <venue> (<year>)``, ``arXiv: <url>``) or their usual variants; fields that
+    cannot be found are left out.
+    """
+    head = content[:FIELDS_HEAD]
+    fields = {"filename": filename, "folder": os.path.dirname(filename)}
+    authors = _header(head, "AUTHORS?")
+    if authors:
+        fields["authors"] = [a.strip() for a in re.split(r",|;|\band\b|&", authors) if a.strip()]
+    venue = _header(head, "JOURNAL", "VENUE", "CONFERENCE", "PUBLISHED IN")
+    year = _header(head, "YEAR", "DATE", "PUBLISHED")
+    if venue:
+        match = re.search(r"\(([^()]*)\)\s*$", venue)
+        if match:
+            year = year or match.group(1)
+            venue = venue[:match.start()].strip()
+        if re.match(r"arXiv:\s*\S", venue, re.IGNORECASE):
+            venue = "arXiv"  # Journal Scout writes "arXiv:<id> [<category>]" for unpublished preprints
+        if venue and venue.lower() not in ("unknown", "n/a"):
+            fields["venue"] = venue
+    # arXiv stamp "arXiv:2101.00001v2 [cs.CL] 4 Jan 2021", or an arxiv.org link
+    stamp = re.search(r"arXiv:\s*(\d{4})\.\d{4,5}(?:v\d+)?\s*\[([a-z\-]+(?:\.[A-Za-z\-]+)?)\]", head)
+    category = _header(head, "CATEGORY", "ARXIV CATEGORY") or (stamp.group(2) if stamp else None)
+    if category:
+        fields["category"] = category
+    arxiv = stamp or re.search(r"arxiv\.org/(?:abs|pdf)/(\d{4})\.\d{4,5}", head, re.IGNORECASE)
+    match = re.search(r"(?:19|20)\d{2}", year or "")
+    if match:
+        fields["year"] = int(match.group(0))
+    elif arxiv:
+        fields["year"] = 2000 + int(arxiv.group(1)[:2])  # new-style arXiv ids start with yymm
+    return fields
+
+
+def iter_papers(papers_dir, filenames, to_embed=None):
+    """Read papers lazily; those not in ``to_embed`` are yielded with ``embed=False``."""
+    for filename in filenames:
+        filepath = os.path.join(papers_dir, filename)
+        with open(filepath, 'rb') as f:
+            raw = f.read()
+        # Universal newlines, as text mode would read the file
+        content = raw.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+        embed = to_embed is None or filename in to_embed
+        yield Paper(filename, content, extract_title(content, filename), doc_id(filename), embed,
+                    extract_fields(content, filename), hashlib.sha256(raw).hexdigest())
+
+
+def batched(papers, max_docs, max_bytes):
+    """Group papers into batches capped by document count and total text size.
+
+    A single paper larger than ``max_bytes`` still forms a batch of its own.
+    """
+    batch, size = [], 0
+    for paper in papers:
+        paper_size = len(paper.content)
+        if batch and (len(batch) >= max_docs or size + paper_size > max_bytes):
+            yield batch
+            batch, size = [], 0
+        batch.append(paper)
+        size += paper_size
+    if batch:
+        yield batch
+
+
+class ExportWriter:
+    """Write the Journal Scout export one document at a time.
+
+    The JSON layout is the one ``importVectorDB`` in ``utils/vectordb.ts`` reads:
+    ``{"name", "createdAt", "dimension", "documents": [...]}``. The file is
+    written under a temporary name and renamed on ``close()``.
+
+    Embeddings are formatted by numpy straight from the float32 buffer
+    (``%.9g`` round-trips float32) instead of going through ``tolist()``, so
+    no Python float objects are created per vector component.
+    """
+
+    def __init__(self, path, name):
+        self.path = path
+        self.name = name
+        self.count = 0
+        self.created_at = datetime.now().isoformat()
+        self._tmp_path = f"{path}.tmp"
+        self._f = None
+
+    def write(self, paper, embedding):
+        if self._f is None:
+            self._f = open(self._tmp_path, 'w', encoding='utf-8')
+            header = json.dumps({"name": self.name, "createdAt": self.created_at, "dimension": len(embedding)})
+            self._f.write(header[:-1] + ', "documents": [')
+        elif self.count:
+            self._f.write(', ')
+        document = json.dumps({
+            "id": export_id(paper.vector_id),
+            "fileName": paper.filename,
+            "content": paper.content,
+            "embedding": None,
+            "metadata": {"title": paper.title, "createdAt": self.created_at}
+        })
+        head, tail = document.split('"embedding": null', 1)
+        self._f.write(head + '"embedding": [')
+        self._f.flush()  # tofile writes to the underlying file descriptor
+        np.asarray(embedding, dtype='float32').tofile(self._f, sep=', ', format='%.9g')
+        self._f.write(']' + tail)
+        self.count += 1
+
+    def close(self):
+        if self._f is None:
+            return
+        self._f.write(']}')
+        self._f.close()
+        os.replace(self._tmp_path, self.path)
+
+
+class MsgpackExportWriter:
+    """Write the Journal Scout export as MessagePack, one document at a time.
+
+    Same layout as ``ExportWriter``, plus ``"embeddingEncoding": "float32le"``:
+    each embedding is a ``bin`` of packed little-endian float32 values rather
+    than an array of numbers, about 5x smaller than the JSON text. The
+    documents array is written with a fixed-size array32 header whose count is
+    patched in on ``close()``, so nothing is buffered in memory.
+
+    Requires ``pip install msgpack``.
+    """
+
+    def __init__(self, path, name):
+        import msgpack
+
+        self.path = path
+        self.name = name
+        self.count = 0
+        self.created_at = datetime.now().isoformat()
+        self._packer = msgpack.Packer(use_bin_type=True)
+        self._tmp_path = f"{path}.tmp"
+        self._f = None
+        self._count_offset = None
+
+    def write(self, paper, embedding):
+        if self._f is None:
+            self._f = open(self._tmp_path, 'wb')
+            self._f.write(self._packer.pack_map_header(5))
+            for key, value in (("name", self.name), ("createdAt", self.created_at),
+                               ("dimension", len(embedding)), ("embeddingEncoding", EMBEDDING_ENCODING)):
+                self._f.write(self._packer.pack(key) + self._packer.pack(value))
+            self._f.write(self._packer.pack("documents"))
+            self._count_offset = self._f.tell() + 1
+            self._f.write(b'\xdd\x00\x00\x00\x00')  # array32, count patched on close()
+        self._f.write(self._packer.pack({
+            "id": export_id(paper.vector_id),
+            "fileName": paper.filename,
+            "content": paper.content,
+            "embedding": np.asarray(embedding, dtype='<f4').tobytes(),
+            "metadata": {"title": paper.title, "createdAt": self.created_at}
+        }))
+        self.count += 1
+
+    def close(self):
+        if self._f is None:
+            return
+        self._f.seek(self._count_offset)
+        self._f.write(self.count.to_bytes(4, 'big'))
+        self._f.close()
+        os.replace(self._tmp_path, self.path)
+
+
+EXPORT_WRITERS = {"json": ExportWriter, "msgpack": MsgpackExportWriter}
+
+
+def load_export(path):
+    """Read a Journal Scout export (JSON or MessagePack) with numpy embeddings.
+
+    Returns the export dict; each document's ``embedding`` is a float32 array.
+    """
+    if path.endswith('.msgpack'):
+        import msgpack
+
+        with open(path, 'rb') as f:
+            data = msgpack.unpack(f, raw=False)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    binary = data.get("embeddingEncoding") == EMBEDDING_ENCODING
+    for document in data["documents"]:
+        embedding = document["embedding"]
+        document["embedding"] = np.frombuffer(embedding, dtype='<f4') if binary else np.asarray(embedding, dtype='float32')
+    return data
@@ -0,0 +1,75 @@
+"""
+Shared store of paper texts for lightweight vector-store payloads.
+
+With ``--payload light`` the stores keep no chunk text: FAISS metadata,
+Chroma entries and Qdrant payloads hold the title, filename and the chunk's
+pointer (``parent_id``, the paper's ``sha256``, and ``start``/``end``
+character offsets), and the text of every paper is stored once,
+zlib-compressed, in a SQLite file keyed by parent id and content hash. A
+search fetches the text of its final top-k hits only.
+
+Stores are synced independently, so one may still point at an older version
+of a paper that another has already re-embedded. Each version is therefore
+kept as long as the manifest of any light store records it (``retain``), and
+a chunk is always sliced from the exact text its offsets were computed on.
+"""
+
+import sqlite3
+import zlib
+
+LOOKUP_BATCH = 250  # versions per query, under SQLite's bound-parameter limit
+
+
+class ContentStore:
+    """Compressed paper texts, one row per version; chunk texts are slices of them."""
+
+    def __init__(self, path, readonly=False):
+        self.path = path
+        if readonly:
+            self._db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+            return
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS versions ("
+            " parent_id INTEGER NOT NULL, sha256 TEXT NOT NULL, filename TEXT NOT NULL, content BLOB NOT NULL,"
+            " PRIMARY KEY (parent_id, sha256))"
+        )
+        self._db.commit()
+
+    def put(self, papers):
+        rows = [(p.vector_id, p.sha256, p.filename, zlib.compress(p.content.encode('utf-8'))) for p in papers]
+        self._db.executemany("INSERT OR IGNORE INTO versions VALUES (?, ?, ?, ?)", rows)
+        self._db.commit()
+
+    def retain(self, versions):
+        """Drop the versions not in ``versions``, a set of ``(parent_id, sha256)``."""
+        stored = self._db.execute("SELECT parent_id, sha256 FROM versions").fetchall()
+        self._db.executemany("DELETE FROM versions WHERE parent_id = ? AND sha256 = ?",
+                             [row for row in stored if row not in versions])
+        self._db.commit()
+
+    def contents(self, versions):
+        """Map ``(parent_id, sha256)`` -> full text for the ``versions`` that are stored."""
+        unique = list(dict.fromkeys((int(parent_id), sha) for parent_id, sha in versions))
+        found = {}
+        for start in range(0, len(unique), LOOKUP_BATCH):
+            part = unique[start:start + LOOKUP_BATCH]
+            condition = " OR ".join(["(parent_id = ? AND sha256 = ?)"] * len(part))
+            rows = self._db.execute(f"SELECT parent_id, sha256, content FROM versions WHERE {condition}",
+                                    [value for version in part for value in version])
+            for parent_id, sha, blob in rows:
+                found[parent_id, sha] = zlib.decompress(blob).decode('utf-8')
+        return found
+
+    def texts(self, rows):
+        """Chunk texts of ``rows`` (dicts with parent_id/sha256/start/end; None stays None)."""
+        versions = [(row["parent_id"], row.get("sha256")) for row in rows if row is not None]
+        contents = self.contents(v for v in versions if v[1])
+        texts = []
+        for row in rows:
+            text = None if row is None else contents.get((row["parent_id"], row.get("sha256")))
+            texts.append(None if text is None else text[row["start"]:row["end"]])
+        return texts
+
+    def close(self):
+        self._db.close()
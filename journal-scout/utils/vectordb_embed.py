@@ -0,0 +1,232 @@
+"""
+Embedding stage shared by the vector database builders.
+
+``model.encode`` pads every batch to its longest member, so a fixed
+``batch_size`` over texts in directory order wastes most of its work on
+padding when short notes and long chunks are mixed. Texts are instead sorted
+by token length and grouped into batches whose padded size
+(longest x count) stays within a token budget; results come back in the
+original order.
+
+On CPU a single process tops out well below the core count for a small model
+like MiniLM, so batches can also be fanned out to a pool of worker processes,
+each holding its own model replica with a pinned number of torch threads.
+"""
+
+import multiprocessing
+import os
+import queue
+
+import numpy as np
+
+from vectordb_common import MAX_BATCH_TOKENS
+
+POLL_SECONDS = 1.0  # how often a waiting pool checks that its workers are still alive
+
+
+def token_lengths(tokenizer, texts):
+    """Token count of each text, including the special tokens the model adds."""
+    encoded = tokenizer(list(texts), add_special_tokens=True, return_attention_mask=False,
+                        return_token_type_ids=False, verbose=False)
+    return [len(ids) for ids in encoded["input_ids"]]
+
+
+def token_budget_batches(lengths, max_tokens=MAX_BATCH_TOKENS):
+    """Yield lists of indices, longest texts first, each within the padded token budget.
+
+    A single text longer than the budget still forms a batch of its own.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    batch, longest = [], 0
+    for i in order:
+        length = max(lengths[i], 1)
+        if batch and max(longest, length) * (len(batch) + 1) > max_tokens:
+            yield batch
+            batch, longest = [], 0
+        batch.append(i)
+        longest = max(longest, length)
+    if batch:
+        yield batch
+
+
+def _pool_worker(model_name, rank, threads, inputs, outputs):
+    """Encode batches from ``inputs`` until a ``None`` sentinel arrives.
+
+    A model that cannot be loaded is reported on ``outputs`` (batch id None)
+    before the worker exits.
+    """
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    if hasattr(os, "sched_setaffinity"):
+        # Give each worker its own cores so replicas do not fight over caches
+        cores = sorted(os.sched_getaffinity(0))
+        if len(cores) >= (rank + 1) * threads:
+            os.sched_setaffinity(0, cores[rank * threads:(rank + 1) * threads])
+
+    try:
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        torch.set_num_threads(threads)
+        model = SentenceTransformer(model_name, device='cpu')
+    except Exception as exc:
+        outputs.put((None, None, f"loading {model_name}: {type(exc).__name__}: {exc}"))
+        return
+    while True:
+        item = inputs.get()
+        if item is None:
+            break
+        batch_id, texts = item
+        try:
+            embeddings = model.encode(texts, batch_size=len(texts), convert_to_numpy=True)
+            outputs.put((batch_id, embeddings.astype('float32'), None))
+        except Exception as exc:
+            outputs.put((batch_id, None, f"{type(exc).__name__}: {exc}"))
+
+
+class EmbeddingPool:
+    """``workers`` processes x ``threads`` torch threads, fed through shared queues."""
+
+    def __init__(self, model_name, workers, threads=None):
+        threads = threads or max(1, (os.cpu_count() or 1) // workers)
+        ctx = multiprocessing.get_context("spawn")
+        self.workers = workers
+        self.threads = threads
+        self._inputs = ctx.Queue(maxsize=2 * workers)
+        self._outputs = ctx.Queue()
+        self._processes = [
+            ctx.Process(target=_pool_worker, args=(model_name, rank, threads, self._inputs, self._outputs), daemon=True)
+            for rank in range(workers)
+        ]
+        for process in self._processes:
+            process.start()
+
+    def encode_batches(self, batches):
+        """Encode a list of text batches; results are returned in the same order.
+
+        Neither feeding nor waiting blocks for longer than ``POLL_SECONDS``
+        without checking the workers, so a worker that died (a failed model
+        load, the OOM killer) stops the build instead of hanging it.
+        """
+        results = [None] * len(batches)
+        queued = done = 0
+        while done < len(batches):
+            while queued < len(batches):
+                try:
+                    self._inputs.put_nowait((queued, batches[queued]))
+                except queue.Full:
+                    break
+                queued += 1
+            try:
+                batch_id, embeddings, error = self._outputs.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                self._check_workers()
+                continue
+            if error is not None:
+                self._fail(f"Embedding worker failed: {error}")
+            results[batch_id] = embeddings
+            done += 1
+        return results
+
+    def _check_workers(self):
+        for rank, process in enumerate(self._processes):
+            if not process.is_alive():
+                self._fail(f"Embedding worker {rank} exited with code {process.exitcode}")
+
+    def _fail(self, message):
+        for process in self._processes:
+            process.terminate()
+        # Batches still queued for the workers must not keep the interpreter from exiting
+        self._inputs.cancel_join_thread()
+        self._processes = []
+        raise RuntimeError(message)
+
+    def close(self):
+        for _ in self._processes:
+            self._inputs.put(None)
+        for process in self._processes:
+            process.join()
+
+
+class Embedder:
+    """Encode texts with length-bucketed, token-budget batches.
+
+    With a ``pool`` the batches are encoded by its worker processes and the
+    local ``model`` is only used for its tokenizer and dimension. With a
+    ``cache`` chunks whose text was embedded before are not encoded again.
+    """
+
+    def __init__(self, model, max_batch_tokens=MAX_BATCH_TOKENS, pool=None, cache=None):
+        self.model = model
+        self.max_batch_tokens = max_batch_tokens
+        self.pool = pool
+        self.cache = cache
+
+    @classmethod
+    def create(cls, model, model_name, max_batch_tokens=MAX_BATCH_TOKENS, workers=1, threads=None, cache=None):
+        if workers > 1:
+            pool = EmbeddingPool(model_name, workers, threads)
+            print(f"  Embedding with {pool.workers} workers x {pool.threads} threads")
+            return cls(model, max_batch_tokens, pool, cache)
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        return cls(model, max_batch_tokens, cache=cache)
+
+    @property
+    def dimension(self):
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts, lengths=None):
+        """Float32 matrix with one row per text, in the order of ``texts``."""
+        if lengths is None:
+            lengths = token_lengths(self.model.tokenizer, texts)
+        # Anything past max_seq_length is truncated by the model, so it costs nothing
+        lengths = [min(n, self.model.max_seq_length) for n in lengths]
+        embeddings = np.empty((len(texts), self.dimension), dtype='float32')
+        batches = list(token_budget_batches(lengths, self.max_batch_tokens))
+        if self.pool is not None:
+            results = self.pool.encode_batches([[texts[i] for i in batch] for batch in batches])
+            for batch, result in zip(batches, results):
+                embeddings[batch] = result
+            return embeddings
+        for batch in batches:
+            embeddings[batch] = self.model.encode(
+                [texts[i] for i in batch],
+                batch_size=len(batch),
+                convert_to_numpy=True,
+            )
+        return embeddings
+
+    def encode_chunks(self, chunks):
+        texts = [c.text for c in chunks]
+        # +2 for the [CLS]/[SEP] tokens the model adds around each chunk
+        lengths = [c.n_tokens + 2 for c in chunks]
+        if self.cache is None:
+            return self.encode(texts, lengths)
+
+        keys = [self.cache.key(text) for text in texts]
+        found = self.cache.get_many(keys)
+        embeddings = np.empty((len(texts), self.dimension), dtype='float32')
+        missing = {}  # key -> first index with that text, so duplicates are encoded once
+        for i, key in enumerate(keys):
+            if key in found:
+                embeddings[i] = found[key]
+            else:
+                missing.setdefault(key, i)
+        if missing:
+            first = list(missing.values())
+            encoded = self.encode([texts[i] for i in first], [lengths[i] for i in first])
+            self.cache.put_many(list(missing), encoded)
+            rows = dict(zip(missing, encoded))
+            for i, key in enumerate(keys):
+                if key in rows:
+                    embeddings[i] = rows[key]
+        return embeddings
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+        if self.cache is not None:
+            print(f"  Embedding cache: {self.cache.summary()}")
+            self.cache.close()
@@ -0,0 +1,287 @@
+"""
+FAISS backend of the vector database builder.
+
+Requirements:
+  pip install faiss-cpu
+
+The index holds one vector per chunk, addressed by chunk id so vectors of
+changed and removed papers are dropped and re-added in place. New vectors are
+appended to an exact float32 vector file on disk (``<DB_NAME>_vectors.f32``/``.ids``);
+when the selected index type (--faiss-index, see ``vectordb_faiss_index``)
+has to be (re)built, it is trained on a sample of that file and filled from
+it in batches, so memory stays bounded by the index itself. The file is kept
+next to approximate indexes for exact reranking and dropped for flat ones.
+Index parameters are recorded in ``<DB_NAME>.faiss.json``; chunk texts and
+metadata go to ``<DB_NAME>_metadata.sqlite`` keyed by chunk id (see
+``vectordb_metadata``), so a sync touches only new, changed and removed
+papers. Query processes can keep searching while a sync runs: the vector
+file only shows them the rows recorded with the saved index, and removals
+are marked in it once the new index is saved (see ``vectordb_vectors``).
+``open_store`` opens all three read-only for query processes, and
+``FaissSearcher`` searches them (see ``vectordb_search``): approximate hits
+are reranked against the exact vectors, a filter that few chunks pass is
+answered by scoring those chunks exactly, and a flat index is scanned with
+blocked matrix products over its stored vectors (see ``exact_search``).
+"""
+
+import os
+
+import faiss
+import numpy as np
+
+from vectordb_backends import STORE_MANIFESTS, StoreBackend
+from vectordb_common import MAX_BATCH_TOKENS
+from vectordb_faiss_index import (
+    EXACT_TYPES, build_index, choose_index, estimate_recall, open_index, outgrown, read_index, read_params,
+    remove_shards, save_index, shard_paths, supports_remove, write_params,
+)
+from vectordb_faiss_shards import build_sharded
+from vectordb_metadata import MetadataStore
+from vectordb_search import Searcher, make_hit, vector_blocks
+from vectordb_vectors import (
+    EXACT_BLOCK, VectorStore, VectorStoreWriter, compact_store, exact_search, remove_store, truncate_store,
+)
+
+DB_NAME = "papers_vectordb"
+INDEX_PATH = f"{DB_NAME}.faiss"
+METADATA_PATH = f"{DB_NAME}_metadata.sqlite"
+VECTORS_BASE = f"{DB_NAME}_vectors"
+COPY_BATCH = 65_536  # kept vectors copied per step into the new vector file
+RERANK_FACTOR = 4  # candidates per hit reranked against the exact vectors
+FILTER_EXACT_MAX = 20_000  # filters passing at most this many chunks are scored exactly
+FILTER_GROWTH = 4  # candidate pool growth while a filter leaves fewer than k hits
+
+
+def open_store(mmap=True, **search):
+    """The built index, its exact vectors (None for flat indexes) and chunk rows, for querying.
+
+    Index and vectors are memory-mapped by default (see ``open_index``), so any
+    number of query processes can open them cheaply and share the page cache.
+    """
+    index = open_index(INDEX_PATH, mmap, **search)
+    # Only the rows recorded with the saved index: anything past them belongs to a sync in progress
+    vectors = VectorStore.open(VECTORS_BASE, index.d, rows=read_params(INDEX_PATH).get("vectorRows"))
+    return index, vectors, MetadataStore(METADATA_PATH, readonly=True)
+
+
+class FaissBackend(StoreBackend):
+    name = "faiss"
+    label = "FAISS index"
+    manifest_path = STORE_MANIFESTS["faiss"]
+
+    def connect(self, manifest, settings):
+        if not (os.path.exists(INDEX_PATH) and os.path.exists(METADATA_PATH)):
+            manifest = self.new_manifest(settings)  # index or metadata missing: re-embed everything
+        params = {} if manifest.is_empty() else read_params(INDEX_PATH)
+        self.index = read_index(INDEX_PATH, params) if params else None
+        self.spec = params or choose_index(0, 0, "flat")
+        self.dim = None if self.index is None else self.index.d
+        if self.index is None:
+            remove_store(VECTORS_BASE)
+        elif params.get("vectorRows") is not None:
+            truncate_store(VECTORS_BASE, params["vectorRows"], self.dim)
+        # Exact vectors of the previous build; without them kept vectors are read from the index
+        self.vectors = None if self.index is None else VectorStore.open(VECTORS_BASE, self.dim, writable=True)
+        self.complete = self.index is None or self.vectors is not None  # file holds every kept vector
+        self.previous = self.index
+        self.staged = None
+        self.added = set()
+        self.metadata = MetadataStore(METADATA_PATH, reset=self.index is None)
+        return manifest
+
+    def old_vectors(self, ids):
+        """Vectors of chunks stored before this run (exact when the vector file exists)."""
+        if self.vectors is not None:
+            return self.vectors.vectors_for(ids)
+        return self.previous.reconstruct_batch(np.asarray(ids, dtype='int64'))
+
+    def remove(self, chunk_ids):
+        self.metadata.remove(chunk_ids)
+        if self.vectors is not None:
+            self.vectors.remove(chunk_ids)
+        if supports_remove(self.index):
+            self.index.remove_ids(np.array(chunk_ids, dtype='int64'))
+        else:
+            # HNSW cannot drop vectors: it is rebuilt in close() from the kept ones
+            self.index = None
+
+    def add(self, papers, chunks, embeddings):
+        ids = np.array([c.chunk_id for c in chunks], dtype='int64')
+        if self.staged is None:
+            self.staged = VectorStoreWriter(VECTORS_BASE, append=True)
+        self.staged.append(ids, embeddings)
+        self.added.update(ids.tolist())
+        self.dim = embeddings.shape[1]
+        for paper in papers:
+            self.metadata.add(paper, [c for c in chunks if c.parent_id == paper.vector_id], self.args.payload == "full")
+        if self.spec.get("shards", 1) > 1:
+            self.index = None  # HNSW shards are rebuilt in close()
+        elif self.index is not None:
+            # Already trained (or flat): update in place; close() decides whether to rebuild
+            self.index.add_with_ids(embeddings, ids)
+
+    def target_spec(self, n):
+        args = self.args
+        return choose_index(n, self.dim, args.faiss_index, args.faiss_nlist,
+                            args.faiss_pq_m, args.faiss_hnsw_m, args.faiss_ef_construction)
+
+    def needs_rebuild(self, target, n):
+        """True when the index is not of the selected type (or an IVF index outgrew its training)."""
+        args = self.args
+        explicit = any(v is not None for v in (args.faiss_nlist, args.faiss_pq_m, args.faiss_hnsw_m, args.faiss_ef_construction))
+        overridden = explicit and target["factory"] != self.spec["factory"]
+        return target["type"] != self.spec["type"] or overridden or outgrown(self.spec, n)
+
+    def is_noop(self):
+        if not super().is_noop() or self.index is None:
+            return super().is_noop()
+        n = self.index.ntotal
+        return not self.needs_rebuild(self.target_spec(n), n)
+
+    def stored_vectors(self, papers):
+        return {paper.vector_id: self.old_vectors(self.manifest.chunk_ids(paper.filename)) for paper in papers}
+
+    def count(self):
+        return 0 if self.index is None else self.index.ntotal
+
+    def finish_vectors(self, ids):
+        """Complete the exact vector file with any kept vectors it lacks and open it."""
+        staged = self.staged or VectorStoreWriter(VECTORS_BASE, append=True)
+        if not self.complete:
+            # The previous (flat) index kept no file: copy its vectors over once
+            kept = np.array([i for i in ids if i not in self.added], dtype='int64')
+            for start in range(0, len(kept), COPY_BATCH):
+                part = kept[start:start + COPY_BATCH]
+                staged.append(part, self.old_vectors(part))
+        staged.close()
+        self.staged = None
+        previous = self.vectors
+        self.vectors = VectorStore(VECTORS_BASE, self.dim, writable=True)
+        if previous is not None:
+            self.vectors.stage(previous.staged)  # removals of this run stay in memory until close()
+            previous.close()
+        if self.vectors.dead > len(self.vectors):
+            self.vectors = compact_store(self.vectors)
+
+    def close(self):
+        ids = self.manifest.all_chunk_ids()
+        self.metadata.commit()
+        self.metadata.close()
+        if self.dim is None:
+            return
+        target = self.target_spec(len(ids))
+        rebuild = self.index is None or self.needs_rebuild(target, len(ids))
+        exact = target["type"] in EXACT_TYPES
+        if rebuild or not exact:
+            self.finish_vectors(ids)
+        elif self.staged is not None:
+            # A flat index updated in place holds the new vectors itself and keeps no vector file
+            self.staged.close()
+            self.staged = None
+        if rebuild:
+            shards = self.args.faiss_shards
+            print(f"  Building FAISS {target['factory']} index over {len(ids)} chunks"
+                  f"{f' in {shards} shards' if shards > 1 else ''}...")
+            if shards > 1:
+                self.index = build_sharded(target, self.dim, ids, VECTORS_BASE, shards, INDEX_PATH)
+            else:
+                self.index = build_index(target, self.dim, ids, self.vectors.vectors_for)
+            self.spec = target
+        if exact and self.vectors is not None:
+            # A flat index holds the exact vectors itself
+            self.vectors.close()
+            self.vectors = None
+        if self.spec.get("shards", 1) == 1:
+            save_index(self.index, INDEX_PATH)
+            remove_shards(INDEX_PATH)
+        # Rows the builds so far wrote; anything past them is dropped by the next run
+        write_params(INDEX_PATH, self.spec, self.index,
+                     vectorRows=0 if self.vectors is None else len(self.vectors.ids))
+        # Readers open the new index from now on: the vector file can stop serving removed chunks
+        if exact:
+            remove_store(VECTORS_BASE)
+        else:
+            self.vectors.commit()
+        if self.args.faiss_eval_recall and self.vectors is not None:
+            print(f"  FAISS {self.spec['factory']} recall@10: {estimate_recall(self.index, self.vectors):.3f}")
+
+    def report(self):
+        lines = super().report()
+        if os.path.exists(INDEX_PATH):
+            shards = self.spec.get("shards", 1)
+            size_mb = sum(os.path.getsize(path) for path in shard_paths(INDEX_PATH, shards)) / (1024 * 1024)
+            layout = f", {shards} shards" if shards > 1 else ""
+            lines.append(f"   Index: {INDEX_PATH} ({self.spec['factory']}{layout}, {size_mb:.1f} MB)")
+        if self.vectors is not None:
+            lines.append(f"   Exact vectors: {VECTORS_BASE}.f32 (for reranking)")
+        return lines + [f"   Metadata: {METADATA_PATH}"]
+
+
+class FaissSearcher(Searcher):
+    name = "faiss"
+    manifest_path = FaissBackend.manifest_path
+
+    def __init__(self, model=None, max_batch_tokens=MAX_BATCH_TOKENS, mmap=True, **search):
+        super().__init__(model, max_batch_tokens)
+        self.index, self.vectors, self.metadata = open_store(mmap, **search)
+        base = faiss.downcast_index(self.index.index) if isinstance(self.index, faiss.IndexIDMap2) else None
+        # Flat: the rows of the index are the exact vectors, in the order of its id map
+        self.flat = base if isinstance(base, faiss.IndexFlat) else None
+        self.flat_ids = faiss.vector_to_array(self.index.id_map) if self.flat is not None else None
+
+    def flat_blocks(self, allowed=None, block=EXACT_BLOCK):
+        """``(ids, vectors)`` blocks of a flat index, restricted to the sorted ids ``allowed``."""
+        for start in range(0, self.flat.ntotal, block):
+            ids = self.flat_ids[start:start + block]
+            vectors = self.flat.reconstruct_n(start, len(ids))
+            if allowed is not None:
+                keep = np.isin(ids, allowed)
+                ids, vectors = ids[keep], vectors[keep]
+            yield ids, vectors
+
+    def vectors_for(self, ids):
+        if self.vectors is not None:
+            return self.vectors.vectors_for(ids)
+        # Built without the vector file: read them back from the index
+        return self.index.reconstruct_batch(np.asarray(ids, dtype='int64'))
+
+    def candidates(self, vectors, k, allowed=None):
+        """Approximate top ``k`` among the sorted ids ``allowed``, widening the search until enough pass."""
+        n = self.index.ntotal
+        fetch = min(n, k * (RERANK_FACTOR if self.vectors is not None else 1))
+        while True:
+            scores, ids = self.index.search(vectors, max(fetch, 1))
+            if allowed is not None:
+                ids = np.where(np.isin(ids, allowed), ids, -1)
+            if self.vectors is not None:
+                scores, ids = self.vectors.rerank(vectors, ids, k)
+            else:
+                # Scores are sorted already: move the filtered-out slots to the end
+                order = np.argsort(ids < 0, axis=1, kind='stable')[:, :k]
+                scores, ids = np.take_along_axis(scores, order, axis=1), np.take_along_axis(ids, order, axis=1)
+            if allowed is None or fetch >= n or (ids >= 0).sum(axis=1).min() >= min(k, len(allowed)):
+                return scores, ids
+            fetch = min(n, fetch * FILTER_GROWTH)
+
+    def search_vectors(self, vectors, k, filters=None):
+        allowed = self.metadata.select(filters) if filters else None
+        if allowed is not None and self.vectors is not None:
+            # Metadata a sync committed ahead of its index: chunks without a stored vector yet
+            allowed = allowed[self.vectors.rows(allowed) >= 0]
+        if self.flat is not None:
+            scores, ids = exact_search(vectors, self.flat_blocks(allowed), k)
+        elif allowed is not None and len(allowed) <= FILTER_EXACT_MAX:
+            scores, ids = exact_search(vectors, vector_blocks(allowed, self.vectors_for), k)
+        else:
+            scores, ids = self.candidates(vectors, k, allowed)
+        rows = self.metadata.get(ids.ravel())
+        width = ids.shape[1]
+        return [
+            [make_hit(i, score, row, row["document"])
+             for i, score, row in zip(ids[q], scores[q], rows[q * width:(q + 1) * width]) if row is not None]
+            for q in range(len(vectors))
+        ]
+
+    def close(self):
+        super().close()
+        self.metadata.close()
@@ -0,0 +1,251 @@
+"""
+FAISS index types of the vector database builder.
+
+``IndexFlatIP`` scans every vector per query, so latency grows linearly with
+the corpus. The FAISS backend can instead build IVF-Flat, IVF-PQ or HNSW-Flat;
+``auto`` keeps the exact flat index for small corpora and switches to an ANN
+index as the chunk count grows. Parameters (nlist, PQ sub-quantizers, HNSW M
+and efConstruction) are derived from the corpus size and dimension, and are
+recorded in a sidecar ``<index>.json`` together with the search-time settings
+(nprobe / efSearch) that ``open_index`` applies.
+
+For memory-bounded deployments the IVF variants can compress vectors:
+OPQ+IVF-PQ (32x), IVF-PQ (16x), 4-bit (8x) or 8-bit (4x) scalar quantizers.
+They are trained on a sample of the exact vectors kept on disk
+(``vectordb_vectors``) and filled from it in batches.
+
+All indexes are addressed by chunk id: flat and HNSW through an
+``IndexIDMap2``, IVF natively with a hashtable direct map so ids can be
+removed and reconstructed.
+
+``open_index`` memory-maps the index file by default: IVF inverted lists and
+flat/HNSW vector codes are read in place rather than copied to the heap, so
+query workers start in milliseconds and share one copy in the page cache.
+The builder replaces the file atomically (``save_index``), so a rebuild never
+changes the pages under a running reader.
+"""
+
+import json
+import math
+import os
+
+import faiss
+import numpy as np
+
+from vectordb_common import FAISS_INDEX_TYPES
+from vectordb_vectors import exact_search
+
+FLAT_MAX = 50_000       # auto: exact search below this many chunks
+HNSW_MAX = 1_000_000    # auto: HNSW up to here, IVF beyond (HNSW's graph gets expensive to build)
+RETRAIN_GROWTH = 4      # IVF is retrained once the corpus outgrows its training size this much
+ADD_BATCH = 65_536      # vectors copied per add when an index is rebuilt
+TRAINED_TYPES = ("ivfflat", "ivfpq", "opq-ivfpq", "ivfsq8", "ivfsq4")
+OPQ_MIN = 1_000         # opq-ivfpq: fewer chunks than this skip the rotation
+EXACT_TYPES = ("flat",)  # indexes that hold the exact vectors themselves
+
+
+def params_path(index_path):
+    return f"{index_path}.json"
+
+
+def _ivf_nlist(n):
+    # ~4 sqrt(n) lists, a power of two, with at least 39 training points per list
+    nlist = 2 ** round(math.log2(max(4 * math.sqrt(max(n, 1)), 1)))
+    return int(max(1, min(nlist, 65_536, n // 39)))
+
+
+def _pq_m(dim, dims_per_code=4):
+    """Most sub-quantizers of at least ``dims_per_code`` dimensions each that divide ``dim``."""
+    for m in range(dim // dims_per_code, 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def choose_index(n, dim, kind="auto", nlist=None, pq_m=None, hnsw_m=None, ef_construction=None):
+    """Index description for ``n`` vectors of ``dim`` dimensions.
+
+    Explicit arguments override the values derived from the data.
+    """
+    if kind == "auto":
+        kind = "flat" if n < FLAT_MAX else "hnsw" if n < HNSW_MAX else "ivfflat"
+    if kind == "flat":
+        return {"type": "flat", "factory": "Flat", "search": {}}
+    if kind == "hnsw":
+        m = hnsw_m or (16 if n < 200_000 else 32)
+        ef = ef_construction or (80 if n < 200_000 else 160)
+        return {"type": "hnsw", "factory": f"HNSW{m},Flat", "m": m, "efConstruction": ef,
+                "search": {"efSearch": max(64, ef // 2)}}
+    if kind not in TRAINED_TYPES:
+        raise ValueError(f"Unknown FAISS index type {kind!r}; expected one of {', '.join(FAISS_INDEX_TYPES)}")
+
+    nlist = nlist or _ivf_nlist(n)
+    spec = {"type": kind, "nlist": nlist, "trainedOn": n,
+            "search": {"nprobe": min(nlist, max(8, nlist // 32))}}
+    if kind == "ivfflat":
+        spec["factory"] = f"IVF{nlist},Flat"
+    elif kind in ("ivfsq8", "ivfsq4"):
+        spec["factory"] = f"IVF{nlist},SQ{kind[-1]}"
+    else:
+        # 8-bit codes need 256 training points per sub-quantizer; tiny corpora get fewer bits
+        nbits = int(min(8, max(1, math.log2(max(n, 2)))))
+        if kind == "ivfpq":
+            m = pq_m or _pq_m(dim)
+            spec.update(factory=f"IVF{nlist},PQ{m}x{nbits}", m=m, nbits=nbits)
+        else:
+            # The OPQ rotation makes fewer, wider sub-quantizers hold up; it trains
+            # 8-bit codes of its own, so very small corpora go without it
+            m = pq_m or _pq_m(dim, 8)
+            opq = f"OPQ{m}," if n >= OPQ_MIN else ""
+            spec.update(factory=f"{opq}IVF{nlist},PQ{m}x{nbits}", m=m, nbits=nbits)
+    return spec
+
+
+def ivf_of(index):
+    """The IVF index inside ``index`` (possibly behind an OPQ transform), or None."""
+    return faiss.try_extract_index_ivf(index)
+
+
+def supports_remove(index):
+    """HNSW graphs cannot drop vectors (nor sharded ones be updated); everything else here can."""
+    if isinstance(index, faiss.IndexShards):
+        return False
+    base = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap2) else index
+    return not isinstance(base, faiss.IndexHNSW)
+
+
+def needs_training(spec):
+    return spec["type"] in TRAINED_TYPES
+
+
+def new_index(spec, dim, direct_map=True):
+    base = faiss.index_factory(dim, spec["factory"], faiss.METRIC_INNER_PRODUCT)
+    if spec["type"] == "hnsw":
+        base.hnsw.efConstruction = spec["efConstruction"]
+    ivf = ivf_of(base)
+    if ivf is not None:
+        # IVF takes ids natively; the hashtable lets remove_ids/reconstruct find them
+        if direct_map:
+            ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+        return base
+    return faiss.IndexIDMap2(base)
+
+
+def train_index(index, spec, ids, vectors_for, seed=0):
+    """Train IVF indexes on a random sample of ``ids`` (a no-op for the others)."""
+    if needs_training(spec):
+        n_train = min(len(ids), max(64 * spec["nlist"], 20_000))
+        sample = np.random.default_rng(seed).choice(ids, n_train, replace=False)
+        index.train(np.ascontiguousarray(vectors_for(np.sort(sample)), dtype='float32'))
+
+
+def fill_index(index, ids, vectors_for):
+    for start in range(0, len(ids), ADD_BATCH):
+        part = ids[start:start + ADD_BATCH]
+        index.add_with_ids(np.ascontiguousarray(vectors_for(part), dtype='float32'), part)
+
+
+def build_index(spec, dim, ids, vectors_for, seed=0):
+    """Build the index described by ``spec`` over ``ids``.
+
+    ``vectors_for(ids)`` returns the float32 rows of those ids; IVF indexes
+    are trained on a random sample and every index is filled in batches.
+    """
+    index = new_index(spec, dim)
+    ids = np.asarray(ids, dtype='int64')
+    train_index(index, spec, ids, vectors_for, seed)
+    fill_index(index, ids, vectors_for)
+    return index
+
+
+def outgrown(spec, n):
+    """True when an IVF index was trained on far fewer vectors than it now holds."""
+    return needs_training(spec) and n > RETRAIN_GROWTH * max(spec.get("trainedOn", 0), 1)
+
+
+def estimate_recall(index, vectors, k=10, n_queries=100, seed=0):
+    """recall@k of ``index`` against exact search, with stored chunks as queries.
+
+    ``vectors`` is a ``VectorStore``; the exact scan streams its live rows in blocks.
+    """
+    n = len(vectors)
+    if not n:
+        return 1.0
+    rng = np.random.default_rng(seed)
+    queries = vectors.vectors_for(np.sort(rng.choice(vectors.live_ids(), min(n_queries, n), replace=False)))
+    k = min(k, n)
+    _, truth = exact_search(queries, vectors.blocks(), k)
+    _, found = index.search(queries, k)
+    return float(np.mean([len(set(a) & set(b)) / k for a, b in zip(found, truth)]))
+
+
+def apply_search_params(index, params):
+    space = faiss.ParameterSpace()
+    for name, value in params.items():
+        space.set_index_parameter(index, name, value)
+
+
+def read_params(index_path):
+    path = params_path(index_path)
+    if not os.path.exists(path):
+        return {"type": "flat", "factory": "Flat", "search": {}}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_params(index_path, spec, index, **extra):
+    data = {**spec, "metric": "inner_product", "dimension": index.d, "ntotal": index.ntotal, **extra}
+    tmp_path = f"{params_path(index_path)}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp_path, params_path(index_path))
+
+
+def save_index(index, index_path):
+    """Write ``index`` next to ``index_path`` and swap it in (readers keep the old file)."""
+    tmp_path = f"{index_path}.tmp"
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, index_path)
+
+
+def mmap_flags(spec):
+    """Read flags that leave the bulk of an index of type ``spec`` in the file."""
+    if spec["type"] in TRAINED_TYPES:
+        return faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY  # inverted lists
+    return faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY  # flat codes (also under HNSW)
+
+
+def shard_paths(index_path, count):
+    """Files of an index kept as ``count`` shards; the first is ``index_path`` itself."""
+    return [index_path] + [f"{index_path}.shard{i}" for i in range(1, count)]
+
+
+def remove_shards(index_path, keep=1):
+    i = keep
+    while os.path.exists(f"{index_path}.shard{i}"):
+        os.remove(f"{index_path}.shard{i}")
+        i += 1
+
+
+def read_index(index_path, params, flags=0):
+    """The index at ``index_path``; unmerged shards are searched together through ``IndexShards``."""
+    count = params.get("shards", 1)
+    if count == 1:
+        return faiss.read_index(index_path, flags)
+    shards = [faiss.read_index(path, flags) for path in shard_paths(index_path, count)]
+    index = faiss.IndexShards(shards[0].d, True, False)  # threaded, keep the shards' own ids
+    for shard in shards:
+        index.add_shard(shard)
+    return index
+
+
+def open_index(index_path, mmap=True, **search):
+    """Load an index for querying with the recorded nprobe/efSearch (or overrides).
+
+    With ``mmap`` the index is mapped read-only instead of copied into memory;
+    it can be searched but not modified.
+    """
+    params = read_params(index_path)
+    index = read_index(index_path, params, mmap_flags(params) if mmap else 0)
+    apply_search_params(index, {**params.get("search", {}), **search})
+    return index
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Sharded, multi-process FAISS index builds.
+
+Chunk ids are hashes, so ``id % K`` splits a corpus into K even shards. A
+sharded (re)build trains IVF quantizers once, writes the trained empty index,
+and fills every shard in its own process from the exact vector file on disk
+(``vectordb_vectors``). Flat and IVF shards are then merged into one index
+(the inverted lists of a shared quantizer simply concatenate). HNSW graphs
+cannot be merged: their shards are kept as ``<index>``, ``<index>.shard1``, ...
+and ``open_index`` searches them together through ``faiss.IndexShards``.
+
+Workers only share files, so shards can also be filled on other machines
+that mount the same filesystem:
+
+  python vectordb_faiss_shards.py <build dir> <vectors base> <dim> <shard>
+"""
+
+import multiprocessing
+import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import faiss
+import numpy as np
+
+from vectordb_faiss_index import (
+    fill_index, ivf_of, new_index, read_index, remove_shards, shard_paths, train_index,
+)
+from vectordb_vectors import VectorStore
+
+
+def build_dir(index_path):
+    return f"{index_path}.build"
+
+
+def shard_ids(ids, shard, count):
+    return ids[ids % count == shard]
+
+
+def build_shard(workdir, vectors_base, dim, shard, threads=None):
+    """Fill shard ``shard`` of the build in ``workdir`` and write it next to the template."""
+    if threads:
+        faiss.omp_set_num_threads(threads)
+    ids = np.load(os.path.join(workdir, "ids.npy"), mmap_mode='r')
+    count = int(np.load(os.path.join(workdir, "shards.npy")))
+    index = faiss.read_index(os.path.join(workdir, "template.faiss"))
+    vectors = VectorStore(vectors_base, dim)
+    fill_index(index, shard_ids(np.asarray(ids), shard, count), vectors.vectors_for)
+    path = os.path.join(workdir, f"shard{shard}.faiss")
+    faiss.write_index(index, f"{path}.tmp")
+    os.replace(f"{path}.tmp", path)
+    return path
+
+
+def build_sharded(spec, dim, ids, vectors_base, shards, index_path, seed=0):
+    """Build the index of ``spec`` over ``ids`` in ``shards`` processes.
+
+    Returns the merged index or, for HNSW, the shards written to
+    ``shard_paths(index_path, shards)`` searched together; ``spec`` then
+    records the shard count so readers open them the same way.
+    """
+    workdir = build_dir(index_path)
+    shutil.rmtree(workdir, ignore_errors=True)
+    os.makedirs(workdir)
+    ids = np.asarray(ids, dtype='int64')
+    vectors = VectorStore(vectors_base, dim)
+    # The direct map is set up after merging; shards are merged without one
+    template = new_index(spec, dim, direct_map=False)
+    train_index(template, spec, ids, vectors.vectors_for, seed)
+    faiss.write_index(template, os.path.join(workdir, "template.faiss"))
+    np.save(os.path.join(workdir, "ids.npy"), ids)
+    np.save(os.path.join(workdir, "shards.npy"), np.int64(shards))
+
+    threads = max(1, (os.cpu_count() or 1) // shards)
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=shards, mp_context=ctx) as pool:
+        futures = [pool.submit(build_shard, workdir, vectors_base, dim, shard, threads) for shard in range(shards)]
+        paths = [future.result() for future in futures]
+
+    if spec["type"] == "hnsw":
+        for path, final in zip(paths, shard_paths(index_path, shards)):
+            os.replace(path, final)
+        remove_shards(index_path, keep=shards)
+        shutil.rmtree(workdir)
+        spec["shards"] = shards
+        return read_index(index_path, spec)
+
+    index = faiss.read_index(paths[0])
+    for path in paths[1:]:
+        index.merge_from(faiss.read_index(path), 0)
+    ivf = ivf_of(index)
+    if ivf is not None:
+        ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+    shutil.rmtree(workdir)
+    return index
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 5:
+        sys.exit(__doc__)
+    print(build_shard(sys.argv[1], sys.argv[2], int(sys.argv[3]), int(sys.argv[4])))
@@ -0,0 +1,164 @@
+"""
+Incremental build manifest shared by the vector database builders.
+
+The manifest records, for every indexed paper, its size, mtime, content hash,
+the embedding model used, its document id and the character spans of its
+chunks (chunk vector ids derive from the document id and chunk position). A rerun of a
+builder compares the papers folder against it so that only new or changed
+files are embedded, vectors of removed files are deleted, and everything else
+is left untouched in the index.
+"""
+
+import hashlib
+import json
+import os
+
+from vectordb_common import chunk_id
+
+MANIFEST_VERSION = 3
+
+
+def file_sha256(filepath, chunk_size=1 << 20):
+    """Hash a file in fixed-size chunks so large papers never sit in memory twice."""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SyncPlan:
+    """Result of comparing the papers folder against the manifest."""
+
+    def __init__(self):
+        self.added = []      # filenames not seen before
+        self.changed = []    # filenames whose content hash differs
+        self.unchanged = []  # filenames that can be skipped
+        self.removed = []    # filenames in the manifest but gone from disk
+        self._stats = {}
+
+    @property
+    def to_embed(self):
+        return self.added + self.changed
+
+    def stale_ids(self, manifest):
+        """Chunk vector ids that must be deleted before the new vectors are written."""
+        return [
+            vector_id
+            for name in self.changed + self.removed
+            for vector_id in manifest.chunk_ids(name)
+        ]
+
+    def is_noop(self):
+        return not (self.added or self.changed or self.removed)
+
+    def summary(self):
+        return (f"{len(self.added)} new, {len(self.changed)} changed, "
+                f"{len(self.removed)} removed, {len(self.unchanged)} unchanged")
+
+
+def light_versions(path):
+    """Paper versions ``(vector_id, sha256)`` the light-payload store of the manifest at ``path`` points at.
+
+    Empty when the manifest is missing or its store keeps full payloads.
+    """
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get("settings", {}).get("payload") != "light":
+        return set()
+    return {(entry["vector_id"], entry["sha256"]) for entry in data.get("files", {}).values()}
+
+
+class Manifest:
+    """Per-file record of what is already stored in a vector database."""
+
+    def __init__(self, path, model_name, settings=None):
+        self.path = path
+        self.model_name = model_name
+        self.settings = settings or {}
+        self.entries = {}
+
+    @classmethod
+    def load(cls, path, model_name, settings=None):
+        manifest = cls(path, model_name, settings)
+        if not os.path.exists(path):
+            return manifest
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("version") != MANIFEST_VERSION or data.get("model") != model_name:
+            # A different model means every stored vector is incompatible
+            print(f"Manifest {path} was built with {data.get('model')!r}; rebuilding from scratch.")
+            return manifest
+        if data.get("settings", {}) != manifest.settings:
+            # Chunking changed, so none of the stored chunk vectors line up any more
+            print(f"Manifest {path} was built with {data.get('settings')}; rebuilding from scratch.")
+            return manifest
+        manifest.entries = data.get("files", {})
+        return manifest
+
+    def is_empty(self):
+        return not self.entries
+
+    def plan(self, papers_dir, filenames):
+        """Classify ``filenames`` as added/changed/unchanged and find removed ones.
+
+        Size and mtime are checked first; the content hash is only computed
+        when they differ, so an unchanged corpus is scanned without reading it.
+        """
+        plan = SyncPlan()
+        for filename in filenames:
+            filepath = os.path.join(papers_dir, filename)
+            st = os.stat(filepath)
+            entry = self.entries.get(filename)
+            if entry and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime_ns:
+                plan.unchanged.append(filename)
+                continue
+            sha = file_sha256(filepath)
+            plan._stats[filename] = (st.st_size, st.st_mtime_ns, sha)
+            if entry is None:
+                plan.added.append(filename)
+            elif entry["sha256"] == sha:
+                # Touched but not modified: refresh the stat fields only
+                entry["size"], entry["mtime"] = st.st_size, st.st_mtime_ns
+                plan.unchanged.append(filename)
+            else:
+                plan.changed.append(filename)
+        seen = set(filenames)
+        plan.removed = [name for name in self.entries if name not in seen]
+        return plan
+
+    def record(self, plan, filename, vector_id, chunks):
+        size, mtime, sha = plan._stats[filename]
+        self.entries[filename] = {
+            "size": size,
+            "mtime": mtime,
+            "sha256": sha,
+            "model": self.model_name,
+            "vector_id": vector_id,
+            "chunks": [[chunk.start, chunk.end] for chunk in chunks],
+        }
+
+    def forget(self, filenames):
+        for filename in filenames:
+            self.entries.pop(filename, None)
+
+    def chunk_ids(self, filename):
+        entry = self.entries[filename]
+        return [chunk_id(entry["vector_id"], i) for i in range(len(entry["chunks"]))]
+
+    def all_chunk_ids(self):
+        return [vector_id for filename in self.entries for vector_id in self.chunk_ids(filename)]
+
+    def save(self):
+        data = {
+            "version": MANIFEST_VERSION,
+            "model": self.model_name,
+            "settings": self.settings,
+            "files": self.entries,
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,102 @@
+"""
+Chunk texts and metadata of a vector store, keyed by vector id.
+
+A search returns ids; the rows behind them live in a SQLite file with the id
+as primary key, so looking up the hits of a query reads a few B-tree pages
+instead of parsing the whole corpus, and a sync inserts and deletes rows
+without rewriting the file. Changes become visible when the builder commits
+at the end of a run, so an interrupted run leaves the previous state intact.
+
+The paper's extracted fields (see ``extract_fields``) are kept as JSON next
+to each row, and ``select`` turns a search filter into the ids that pass it.
+"""
+
+import json
+import sqlite3
+
+import numpy as np
+
+COLUMNS = ("id", "parent_id", "chunk", "start", "end", "filename", "title", "document", "sha256", "fields")
+LOOKUP_BATCH = 500  # ids per query, under SQLite's bound-parameter limit
+QUERY_MMAP_MB = 256  # read-only connections map this much of the file
+RANGE_OPERATORS = {"gte": ">=", "lte": "<="}
+
+
+class MetadataStore:
+    """SQLite table of chunk rows ``{"id", "parent_id", "chunk", "start", "end", "filename", "title", "document", "sha256", "fields"}``.
+
+    ``sha256`` names the version of the paper the offsets point into (see ``vectordb_content``).
+    """
+
+    def __init__(self, path, reset=False, readonly=False):
+        self.path = path
+        if readonly:
+            self._db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+            self._db.execute(f"PRAGMA mmap_size = {QUERY_MMAP_MB * 1024 * 1024}")
+            return
+        self._db = sqlite3.connect(path, timeout=30)
+        if reset:
+            self._db.execute("DROP TABLE IF EXISTS chunks")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " id INTEGER PRIMARY KEY, parent_id INTEGER NOT NULL, chunk INTEGER NOT NULL,"
+            ' start INTEGER NOT NULL, "end" INTEGER NOT NULL,'
+            " filename TEXT NOT NULL, title TEXT NOT NULL, document TEXT NOT NULL, sha256 TEXT NOT NULL,"
+            " fields TEXT NOT NULL)"
+        )
+        self._db.commit()
+
+    def add(self, paper, chunks, with_text=True):
+        """Store the rows of ``chunks``; without ``with_text`` their text is left empty (see ``vectordb_content``)."""
+        fields = json.dumps(paper.fields)
+        rows = [(c.chunk_id, c.parent_id, c.index, c.start, c.end, paper.filename, paper.title,
+                 c.text if with_text else "", paper.sha256, fields) for c in chunks]
+        self._db.executemany(f"INSERT OR REPLACE INTO chunks VALUES ({','.join('?' * len(COLUMNS))})", rows)
+
+    def remove(self, ids):
+        self._db.executemany("DELETE FROM chunks WHERE id = ?", [(int(i),) for i in ids])
+
+    def get(self, ids):
+        """Rows of ``ids`` in the order given (None for unknown ids, e.g. FAISS's -1)."""
+        ids = [int(i) for i in ids]
+        found = {}
+        unique = list(dict.fromkeys(ids))
+        columns = ', '.join(f'"{c}"' for c in COLUMNS)
+        for start in range(0, len(unique), LOOKUP_BATCH):
+            part = unique[start:start + LOOKUP_BATCH]
+            rows = self._db.execute(f"SELECT {columns} FROM chunks WHERE id IN ({','.join('?' * len(part))})", part)
+            for row in rows:
+                row = dict(zip(COLUMNS, row))
+                row["fields"] = json.loads(row["fields"])
+                found[row["id"]] = row
+        return [found.get(i) for i in ids]
+
+    def select(self, filters):
+        """Sorted ids of the chunks whose fields pass ``filters`` (see ``check_filters``).
+
+        ``json_each`` yields a scalar field once and a list field (authors) per
+        element, so a condition holds when any element of the field meets it.
+        """
+        clauses, params = [], []
+        for key, value in filters.items():
+            if isinstance(value, dict):
+                condition = " AND ".join(f"value {RANGE_OPERATORS[op]} ?" for op in value)
+                params += [f"$.{key}", *value.values()]
+            elif isinstance(value, (list, tuple, set)):
+                condition = f"value IN ({','.join('?' * len(value))})"
+                params += [f"$.{key}", *value]
+            else:
+                condition = "value = ?"
+                params += [f"$.{key}", value]
+            clauses.append(f"EXISTS (SELECT 1 FROM json_each(fields, ?) WHERE {condition})")
+        sql = f"SELECT id FROM chunks WHERE {' AND '.join(clauses) or '1'} ORDER BY id"
+        return np.fromiter((row[0] for row in self._db.execute(sql, params)), dtype='int64')
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def commit(self):
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,245 @@
+"""
+Qdrant backend of the vector database builder.
+
+Requirements:
+  pip install qdrant-client
+
+The collection holds one point per chunk, with the chunk id as point id and
+its text and metadata as payload (no text with --payload light, see
+``vectordb_content``), in local storage under ``DB_DIR``.
+
+A sync never takes the collection down: it is created only when missing,
+new and changed chunks are upserted over their stable ids, and points of
+changed or removed papers that were not overwritten are deleted at the end
+of the run. Starting over (--rebuild, new settings) overwrites the live
+collection the same way and then sweeps out every point the new manifest
+does not list; only a change of vector size forces it to be recreated.
+
+Points are uploaded in --qdrant-batch requests by --qdrant-workers threads
+without waiting for Qdrant to apply each one; the last batch is sent again
+with ``wait=True`` at the end of the run, and since a collection applies its
+updates in order, that returns once every upload is applied. The collection
+can keep quantized vectors in RAM and the originals plus payload on disk
+(--qdrant-quantization, --qdrant-on-disk), with HNSW m / ef_construct set
+by --qdrant-hnsw-m / --qdrant-ef-construct; these are applied to an existing
+collection as well, which Qdrant re-indexes in the background.
+
+Every point carries the paper's extracted fields (year, venue, authors,
+category, folder, filename; see ``extract_fields``) with a payload index on
+each, so ``qdrant_filter`` conditions prefilter the HNSW search.
+``QdrantSearcher`` sends the queries of a search in one batch request (see
+``vectordb_search``).
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    BinaryQuantization, BinaryQuantizationConfig, Distance, FieldCondition, Filter, HnswConfigDiff, MatchAny,
+    MatchValue, PayloadSchemaType, PointIdsList, PointStruct, QueryRequest, Range, ScalarQuantization,
+    ScalarQuantizationConfig, ScalarType, SearchParams, VectorParams, VectorParamsDiff,
+)
+
+from vectordb_backends import STORE_MANIFESTS, StoreBackend
+from vectordb_common import FILTER_FIELDS, MAX_BATCH_TOKENS
+from vectordb_search import Searcher, make_hit
+
+DB_DIR = "./qdrant_db"
+COLLECTION_NAME = "papers_vectordb"
+DELETE_BATCH = 1_000  # point ids per delete / scroll call
+
+
+def qdrant_filter(filters):
+    """Qdrant ``Filter`` for ``{field: value | [any of values] | {"gte": .., "lte": ..}}``, or None."""
+    if not filters:
+        return None
+    conditions = []
+    for key, value in filters.items():
+        if isinstance(value, dict):
+            conditions.append(FieldCondition(key=key, range=Range(**value)))
+        elif isinstance(value, (list, tuple, set)):
+            conditions.append(FieldCondition(key=key, match=MatchAny(any=list(value))))
+        else:
+            conditions.append(FieldCondition(key=key, match=MatchValue(value=value)))
+    return Filter(must=conditions)
+
+
+class QdrantBackend(StoreBackend):
+    name = "qdrant"
+    label = "Qdrant collection"
+    manifest_path = STORE_MANIFESTS["qdrant"]
+
+    def connect(self, manifest, settings):
+        args = self.args
+        print("Initializing Qdrant...")
+        if args.qdrant_url:
+            self.client = QdrantClient(url=args.qdrant_url, api_key=os.environ.get("QDRANT_API_KEY"))
+            self.workers = max(1, args.qdrant_workers)
+        else:
+            self.client = QdrantClient(path=DB_DIR)  # Local storage
+            self.workers = 1
+        self.uploads = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="qdrant-upload")
+        self.pending = []
+        self.last_batch = None
+
+        exists = self.client.collection_exists(COLLECTION_NAME)
+        if not exists or self.client.count(COLLECTION_NAME).count == 0:
+            manifest = self.new_manifest(settings)  # collection missing or wiped: re-embed everything
+        self.created = exists  # otherwise created with the first batch
+        self.checked = not exists
+        # Starting over on a live collection: overwrite it, then sweep out what is left
+        self.sweep = exists and manifest.is_empty()
+        self.stale = set()
+        self.added = set()
+        if exists:
+            self.configure()
+            self.index_fields()
+        return manifest
+
+    def quantization(self):
+        if self.args.qdrant_quantization == "scalar":
+            return ScalarQuantization(scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True))
+        if self.args.qdrant_quantization == "binary":
+            return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+        return None
+
+    def hnsw(self):
+        if self.args.qdrant_hnsw_m is None and self.args.qdrant_ef_construct is None:
+            return None
+        return HnswConfigDiff(m=self.args.qdrant_hnsw_m, ef_construct=self.args.qdrant_ef_construct)
+
+    def index_fields(self):
+        existing = self.client.get_collection(COLLECTION_NAME).payload_schema
+        for field, kind in FILTER_FIELDS.items():
+            if field not in existing:
+                self.client.create_payload_index(COLLECTION_NAME, field_name=field, field_schema=PayloadSchemaType(kind))
+
+    def configure(self):
+        """Apply the storage options given on the command line to the existing collection."""
+        args = self.args
+        changes = {"hnsw_config": self.hnsw(), "quantization_config": self.quantization()}
+        if args.qdrant_on_disk:
+            changes["vectors_config"] = {"": VectorParamsDiff(on_disk=True)}
+        changes = {key: value for key, value in changes.items() if value is not None}
+        if changes:
+            self.client.update_collection(collection_name=COLLECTION_NAME, **changes)
+
+    def remove(self, chunk_ids):
+        # Deferred to close(): changed chunks are overwritten in place meanwhile
+        self.stale.update(chunk_ids)
+
+    def delete(self, chunk_ids):
+        chunk_ids = list(chunk_ids)
+        for start in range(0, len(chunk_ids), DELETE_BATCH):
+            self.client.delete(collection_name=COLLECTION_NAME,
+                               points_selector=PointIdsList(points=chunk_ids[start:start + DELETE_BATCH]))
+
+    def create(self, dim):
+        self.client.create_collection(
+            collection_name=COLLECTION_NAME,
+            vectors_config=VectorParams(size=dim, distance=Distance.COSINE, on_disk=self.args.qdrant_on_disk or None),
+            on_disk_payload=self.args.qdrant_on_disk or None,
+            hnsw_config=self.hnsw(),
+            quantization_config=self.quantization(),
+        )
+        self.created = True
+        self.index_fields()
+
+    def upload(self, points, wait=False):
+        self.client.upsert(collection_name=COLLECTION_NAME, points=points, wait=wait)
+
+    def payload(self, paper, chunk):
+        payload = {"filename": paper.filename, "title": paper.title, "sha256": paper.sha256,
+                   **paper.fields, **chunk.metadata()}
+        if self.args.payload == "full":
+            payload["content"] = chunk.text
+        return payload
+
+    def add(self, papers, chunks, embeddings):
+        if not self.checked:
+            self.checked = True
+            if self.client.get_collection(COLLECTION_NAME).config.params.vectors.size != embeddings.shape[1]:
+                print("  Vector size changed: recreating the Qdrant collection")
+                self.client.delete_collection(COLLECTION_NAME)
+                self.created = self.sweep = False
+                self.stale.clear()
+        if not self.created:
+            self.create(embeddings.shape[1])
+        self.added.update(c.chunk_id for c in chunks)
+        papers_by_id = {p.vector_id: p for p in papers}
+        for start in range(0, len(chunks), self.args.qdrant_batch):
+            part = slice(start, start + self.args.qdrant_batch)
+            points = [
+                PointStruct(id=chunk.chunk_id, vector=embedding, payload=self.payload(papers_by_id[chunk.parent_id], chunk))
+                for chunk, embedding in zip(chunks[part], embeddings[part].tolist())
+            ]
+            # Uploads run behind the embedding; only a few batches are held at once
+            while len(self.pending) >= 2 * self.workers:
+                self.pending.pop(0).result()
+            self.pending.append(self.uploads.submit(self.upload, points))
+            self.last_batch = points
+
+    def stored_vectors(self, papers):
+        ids = {paper.vector_id: self.manifest.chunk_ids(paper.filename) for paper in papers}
+        stored = self.client.retrieve(
+            collection_name=COLLECTION_NAME, ids=[i for chunk_ids in ids.values() for i in chunk_ids], with_vectors=True
+        )
+        stored = {point.id: point.vector for point in stored}
+        return {vector_id: [stored[i] for i in chunk_ids] for vector_id, chunk_ids in ids.items()}
+
+    def stored_ids(self):
+        offset = None
+        while True:
+            points, offset = self.client.scroll(COLLECTION_NAME, limit=DELETE_BATCH, offset=offset,
+                                                with_payload=False, with_vectors=False)
+            yield from (point.id for point in points)
+            if offset is None:
+                return
+
+    def close(self):
+        for future in self.pending:
+            future.result()
+        self.uploads.shutdown()
+        if self.last_batch is not None:
+            # Consistency barrier: updates are applied in order, so once this
+            # re-upload is applied every earlier upload is too
+            self.upload(self.last_batch, wait=True)
+        if self.stale:
+            self.delete(self.stale - self.added)
+        if self.sweep:
+            live = set(self.manifest.all_chunk_ids())
+            self.delete([i for i in self.stored_ids() if i not in live])
+
+    def count(self):
+        if not self.created:
+            return 0
+        return self.client.count(COLLECTION_NAME).count
+
+    def report(self):
+        return super().report() + [f"   Location: {self.args.qdrant_url or DB_DIR}"]
+
+
+class QdrantSearcher(Searcher):
+    name = "qdrant"
+    manifest_path = QdrantBackend.manifest_path
+
+    def __init__(self, model=None, max_batch_tokens=MAX_BATCH_TOKENS, url=None, hnsw_ef=None):
+        super().__init__(model, max_batch_tokens)
+        if url:
+            self.client = QdrantClient(url=url, api_key=os.environ.get("QDRANT_API_KEY"))
+        else:
+            self.client = QdrantClient(path=DB_DIR)
+        self.params = SearchParams(hnsw_ef=hnsw_ef) if hnsw_ef else None
+
+    def search_vectors(self, vectors, k, filters=None):
+        query_filter = qdrant_filter(filters)
+        requests = [QueryRequest(query=vector, filter=query_filter, params=self.params, limit=k, with_payload=True)
+                    for vector in vectors.tolist()]
+        responses = self.client.query_batch_points(COLLECTION_NAME, requests=requests)
+        return [[make_hit(point.id, point.score, point.payload, point.payload.get("content")) for point in response.points]
+                for response in responses]
+
+    def close(self):
+        super().close()
+        self.client.close()
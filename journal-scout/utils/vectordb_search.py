@@ -0,0 +1,261 @@
+"""
+Query side of the vector databases: one search API over every built store.
+
+``open_searcher`` opens the FAISS index, Chroma collection or Qdrant
+collection the builders wrote (a named one, or the first one found) and
+returns a ``Searcher``. Its ``search`` takes a query string, a list of them
+or query vectors, and returns hits of the same shape from every backend:
+
+  {"id", "score", "filename", "title", "parent_id", "sha256", "chunk", "start", "end", "text", "fields"}
+
+``score`` is the cosine similarity, ``fields`` the paper's extracted fields
+(year, venue, authors, category, folder) and ``text`` the chunk text, read
+from the shared content store when the store was built with --payload light.
+Filters take the same form everywhere (see ``check_filters``). The model
+named in the store's manifest is loaded once per process and shared by every
+searcher, so backends can be compared side by side at the cost of one model.
+
+``search_many`` runs large query sets: queries are taken ``QUERY_BLOCK`` at a
+time, encoded in length-bucketed, token-budget batches (see ``Embedder``)
+while the previous block is searched, and each block is searched with a single
+backend call, so only one block of queries and hits is held at a time.
+"""
+
+import importlib
+import itertools
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from vectordb_chunking import normalize
+from vectordb_common import CONTENT_PATH, FILTER_FIELDS, MAX_BATCH_TOKENS, check_filters
+from vectordb_content import ContentStore
+from vectordb_embed import Embedder
+from vectordb_vectors import EXACT_BLOCK
+
+# name -> (module, class), in the order "auto" looks for a built store;
+# modules are imported on demand so only the searched backend's client is needed
+SEARCHERS = {
+    "faiss": ("vectordb_faiss", "FaissSearcher"),
+    "qdrant": ("vectordb_qdrant", "QdrantSearcher"),
+    "chroma": ("vectordb_chroma", "ChromaSearcher"),
+}
+QUERY_BLOCK = 512  # queries encoded and searched together by search_many
+FILTER_PATTERN = re.compile(r"^\s*(\w+)\s*(>=|<=|=)\s*(.*?)\s*$")
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def load_model(model_name):
+    """The SentenceTransformer ``model_name``, loaded once per process."""
+    with _models_lock:
+        if model_name not in _models:
+            from sentence_transformers import SentenceTransformer
+
+            _models[model_name] = SentenceTransformer(model_name)
+        return _models[model_name]
+
+
+def manifest_model(manifest_path):
+    """Embedding model a store was built with, as recorded in its manifest."""
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)["model"]
+
+
+def parse_filters(expressions):
+    """Filters from ``field=value``, ``field=a,b`` (any of), ``field>=value`` and ``field<=value``."""
+    filters = {}
+    for expression in expressions:
+        match = FILTER_PATTERN.match(expression)
+        if not match:
+            raise ValueError(f"Cannot parse filter {expression!r}; expected field=value, field>=value or field<=value")
+        key, op, text = match.groups()
+        convert = int if FILTER_FIELDS.get(key) == "integer" else str
+        if op == "=":
+            values = [convert(value.strip()) for value in text.split(',') if value.strip()]
+            filters[key] = values[0] if len(values) == 1 else values
+        else:
+            bounds = filters[key] if isinstance(filters.get(key), dict) else {}
+            filters[key] = {**bounds, "gte" if op == ">=" else "lte": convert(text)}
+    check_filters(filters)
+    return filters
+
+
+def vector_blocks(ids, vectors_for, block=EXACT_BLOCK):
+    """``(ids, vectors)`` of ``ids`` read ``block`` at a time, for ``exact_search``."""
+    for start in range(0, len(ids), block):
+        part = np.asarray(ids[start:start + block], dtype='int64')
+        yield part, vectors_for(part)
+
+
+def make_hit(chunk_id, score, record, text=None):
+    """A hit from a stored ``record``: chunk metadata with the paper's fields, flat or under ``"fields"``."""
+    fields = record.get("fields") or {key: record[key] for key in FILTER_FIELDS if key in record}
+    return {
+        "id": int(chunk_id),
+        "score": float(score),
+        "filename": record["filename"],
+        "title": record["title"],
+        "parent_id": int(record["parent_id"]),
+        "sha256": record.get("sha256") or None,
+        "chunk": int(record["chunk"]),
+        "start": int(record["start"]),
+        "end": int(record["end"]),
+        "text": text or None,
+        "fields": {key: value for key, value in fields.items() if key != "filename"},
+    }
+
+
+class Searcher:
+    """Search one built store.
+
+    Subclasses set ``manifest_path`` (their builder's) and implement
+    ``search_vectors``; hits whose store keeps no text get it from the
+    content store here.
+    """
+
+    name = None
+    manifest_path = None
+
+    def __init__(self, model=None, max_batch_tokens=MAX_BATCH_TOKENS):
+        self.model_name = manifest_model(self.manifest_path)
+        self._model = model
+        self.max_batch_tokens = max_batch_tokens
+        self.content = ContentStore(CONTENT_PATH, readonly=True) if os.path.exists(CONTENT_PATH) else None
+
+    @classmethod
+    def built(cls):
+        return os.path.exists(cls.manifest_path)
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = load_model(self.model_name)
+        return self._model
+
+    def encode(self, texts):
+        """Unit query vectors, as the builders store unit chunk vectors."""
+        return normalize(Embedder(self.model, self.max_batch_tokens).encode(list(texts))).astype('float32')
+
+    def search(self, query, k=10, filters=None):
+        """Top ``k`` hits of ``query``.
+
+        A string or a vector gives one list of hits; a list of strings or a
+        matrix of vectors gives one list per query.
+        """
+        check_filters(filters)
+        if isinstance(query, str):
+            single, vectors = True, self.encode([query])
+        elif isinstance(query, (list, tuple)) and query and isinstance(query[0], str):
+            single, vectors = False, self.encode(query)
+        else:
+            vectors = np.asarray(query, dtype='float32')
+            single = vectors.ndim == 1
+            vectors = normalize(np.atleast_2d(vectors)).astype('float32')
+        hits = self.with_texts(self.search_vectors(vectors, k, filters or None))
+        return hits[0] if single else hits
+
+    def search_many(self, queries, k=10, filters=None, block=QUERY_BLOCK, with_text=True, keyed=False):
+        """Yield ``(query, hits)`` for each string of the iterable ``queries``, in order.
+
+        With ``keyed`` the iterable holds ``(key, query)`` pairs instead and
+        ``(key, query, hits)`` is yielded, so a caller can carry e.g. a line
+        number along without reading its input twice. The next block is
+        encoded on a second thread while the current one is searched; without
+        ``with_text`` hits carry no chunk text.
+        """
+        check_filters(filters)
+        items = iter(queries) if keyed else ((None, query) for query in queries)
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="query-encoder") as encoder:
+            current = list(itertools.islice(items, block))
+            pending = encoder.submit(self.encode, [query for _, query in current]) if current else None
+            while pending is not None:
+                vectors = pending.result()
+                batch, current = current, list(itertools.islice(items, block))
+                pending = encoder.submit(self.encode, [query for _, query in current]) if current else None
+                results = self.search_vectors(vectors, k, filters or None)
+                if with_text:
+                    self.with_texts(results)
+                else:
+                    for hit in itertools.chain.from_iterable(results):
+                        del hit["text"]
+                for (key, query), hits in zip(batch, results):
+                    yield (key, query, hits) if keyed else (query, hits)
+
+    def search_vectors(self, vectors, k, filters=None):
+        """One list of hits per row of ``vectors`` (unit float32); ``text`` is None where the store keeps none."""
+        raise NotImplementedError
+
+    def with_texts(self, results):
+        """Fill in the chunk texts a light payload leaves out."""
+        missing = [hit for hits in results for hit in hits if hit["text"] is None]
+        if missing and self.content is not None:
+            for hit, text in zip(missing, self.content.texts(missing)):
+                hit["text"] = text
+        return results
+
+    def close(self):
+        if self.content is not None:
+            self.content.close()
+
+
+def load_searcher(name):
+    if name not in SEARCHERS:
+        raise ValueError(f"Unknown backend {name!r}; expected one of {', '.join(SEARCHERS)}")
+    module, cls = SEARCHERS[name]
+    return getattr(importlib.import_module(module), cls)
+
+
+def built_backend():
+    """Name of the first built store whose client library is installed."""
+    for name in SEARCHERS:
+        try:
+            if load_searcher(name).built():
+                return name
+        except ImportError:
+            continue
+    raise FileNotFoundError("No vector database found; build one with create_vectordb.py first")
+
+
+def open_searcher(backend="auto", model=None, **options):
+    """A ``Searcher`` over the store of ``backend`` (or the first built one for "auto").
+
+    ``model`` is a loaded SentenceTransformer to reuse; ``options`` go to the
+    backend's searcher (see ``searcher_options``).
+    """
+    if backend == "auto":
+        backend = built_backend()
+    return load_searcher(backend)(model, **options)
+
+
+def add_search_arguments(parser):
+    group = parser.add_argument_group("search")
+    group.add_argument("--backend", default="auto", choices=["auto", *SEARCHERS],
+                       help="store to search (default: the first built of faiss, qdrant, chroma)")
+    group.add_argument("--k", type=int, default=10, help="hits per query")
+    group.add_argument("--filter", action="append", default=[], metavar="EXPR",
+                       help="field=value, field=a,b (any of), field>=value or field<=value on "
+                            f"{', '.join(FILTER_FIELDS)}; repeat to combine")
+    group.add_argument("--faiss-nprobe", type=int, help="IVF lists probed per query (default: as built)")
+    group.add_argument("--faiss-ef-search", type=int, help="HNSW candidates per query (default: as built)")
+    group.add_argument("--qdrant-url", default=None,
+                       help="search a Qdrant server instead of the local store (API key from QDRANT_API_KEY)")
+    group.add_argument("--qdrant-ef", type=int, help="Qdrant HNSW candidates per query (default: the server's)")
+    group.add_argument("--max-batch-tokens", type=int, default=MAX_BATCH_TOKENS,
+                       help="padded tokens per model.encode call when encoding queries")
+
+
+def searcher_options(args, backend):
+    """Constructor options of ``backend``'s searcher from the ``add_search_arguments`` options."""
+    options = {"max_batch_tokens": args.max_batch_tokens}
+    if backend == "faiss":
+        search = {"nprobe": args.faiss_nprobe, "efSearch": args.faiss_ef_search}
+        options.update((key, value) for key, value in search.items() if value is not None)
+    elif backend == "qdrant":
+        options.update(url=args.qdrant_url, hnsw_ef=args.qdrant_ef)
+    return options
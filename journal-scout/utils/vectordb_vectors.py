@@ -0,0 +1,231 @@
+"""
+Exact chunk vectors on disk, next to a (possibly compressed) FAISS index.
+
+Rows are raw little-endian float32 in ``<base>.f32`` and their chunk ids raw
+int64 in ``<base>.ids``; both are read through ``np.memmap``, so holding the
+store costs page cache rather than heap. The FAISS backend appends new vectors
+here during a build, trains and fills compressed indexes from it in batches,
+and query tools can rerank approximate hits against the exact vectors.
+``exact_search`` is the blocked exact top-k scan shared by the flat search,
+recall estimates and the benchmark's ground truth.
+
+Query processes map the store while a sync updates it, so a sync never
+changes what they can see: readers size the store by the row count recorded
+with the saved index (``rows``), new vectors are appended past it, and
+removals are staged in memory until ``commit`` marks them (id -1) once the
+new index is saved. When an id occurs twice the newest row wins, so a
+changed chunk appended under its old id is found before the old row is
+marked. Dead rows are dropped by ``compact_store`` once they outnumber the
+live ones. Ids a reader does not know (removed by a sync since its index
+was saved) are skipped rather than raising.
+"""
+
+import os
+
+import numpy as np
+
+EXACT_BLOCK = 16_384  # stored vectors scored per block by exact_search
+
+
+def exact_search(queries, blocks, k):
+    """Exact inner-product top ``k`` of ``queries`` over ``(ids, vectors)`` blocks.
+
+    Each block is scored with one matrix product and merged into the running
+    top ``k`` with ``argpartition``, so memory stays at queries x block.
+    Returns ``(scores, ids)`` shaped like a FAISS search result (-1 = empty slot).
+    """
+    best_scores = np.full((len(queries), k), -np.inf, dtype='float32')
+    best_ids = np.full((len(queries), k), -1, dtype='int64')
+    for part, vectors in blocks:
+        if not len(part):
+            continue
+        scores = np.concatenate([best_scores, queries @ vectors.T], axis=1)
+        candidates = np.concatenate([best_ids, np.broadcast_to(part, (len(queries), len(part)))], axis=1)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, top, axis=1)
+        best_ids = np.take_along_axis(candidates, top, axis=1)
+    order = np.argsort(-best_scores, axis=1, kind='stable')
+    return np.take_along_axis(best_scores, order, axis=1), np.take_along_axis(best_ids, order, axis=1)
+
+
+def store_paths(base):
+    return f"{base}.f32", f"{base}.ids"
+
+
+class VectorStore:
+    """Read-only, memory-mapped float32 vectors addressed by chunk id."""
+
+    def __init__(self, base, dim, writable=False, rows=None):
+        self.base = base
+        self.dim = dim
+        vectors_path, ids_path = store_paths(base)
+        n = min(os.path.getsize(ids_path) // 8, os.path.getsize(vectors_path) // (4 * dim))
+        if rows is not None:
+            n = min(n, rows)  # rows past the recorded count belong to a sync in progress
+        self.ids = (np.memmap(ids_path, dtype='<i8', mode='r+' if writable else 'r', shape=(n,)) if n
+                    else np.empty(0, dtype='int64'))
+        self.vectors = (np.memmap(vectors_path, dtype='<f4', mode='r', shape=(n, dim)) if n
+                        else np.empty((0, dim), dtype='float32'))
+        self.staged = np.empty(0, dtype='int64')  # rows removed in memory, marked by commit()
+        self._index_ids()
+
+    def _index_ids(self):
+        ids = np.array(self.ids)
+        ids[self.staged] = -1
+        self._order = np.argsort(ids, kind='stable')
+        self._sorted = ids[self._order]
+        # Live: not removed, and the last (newest) row of its id
+        self._live = (self._sorted >= 0) & np.append(self._sorted[1:] != self._sorted[:-1], True)
+
+    @classmethod
+    def open(cls, base, dim, writable=False, rows=None):
+        """The store at ``base``, or None when there is none."""
+        if not all(os.path.exists(path) for path in store_paths(base)):
+            return None
+        return cls(base, dim, writable, rows)
+
+    def __len__(self):
+        """Live vectors."""
+        return int(self._live.sum())
+
+    @property
+    def dead(self):
+        return len(self.ids) - len(self)
+
+    def remove(self, ids):
+        """Stage the rows of ``ids`` that are present as dead; the file is untouched until ``commit``."""
+        rows = self.rows(ids)
+        self.stage(rows[rows >= 0])
+
+    def stage(self, rows):
+        if len(rows):
+            self.staged = np.union1d(self.staged, rows)
+            self._index_ids()
+
+    def commit(self):
+        """Mark the staged rows dead in the file (store opened writable), once no reader needs them."""
+        if len(self.staged):
+            self.ids[self.staged] = -1
+            self.ids.flush()
+            self.staged = np.empty(0, dtype='int64')
+
+    def __contains__(self, chunk_id):
+        pos = np.searchsorted(self._sorted, chunk_id)
+        return pos < len(self._sorted) and self._sorted[pos] == chunk_id
+
+    def rows(self, ids):
+        """Row of each of ``ids`` (the newest one), -1 for ids the store does not hold."""
+        ids = np.asarray(ids, dtype='int64')
+        if not len(self._sorted):
+            return np.full(len(ids), -1, dtype='int64')
+        pos = np.maximum(np.searchsorted(self._sorted, ids, side='right') - 1, 0)
+        found = (ids >= 0) & (self._sorted[pos] == ids)
+        return np.where(found, self._order[pos], -1)
+
+    def live_ids(self):
+        return self._sorted[self._live]
+
+    def blocks(self, block=EXACT_BLOCK):
+        """``(ids, vectors)`` of the live rows, read ``block`` rows at a time in file order (for ``exact_search``)."""
+        live = np.zeros(len(self.ids), dtype=bool)
+        live[self._order[self._live]] = True
+        for start in range(0, len(self.ids), block):
+            keep = live[start:start + block]
+            yield np.asarray(self.ids[start:start + block])[keep], np.asarray(self.vectors[start:start + block])[keep]
+
+    def vectors_for(self, ids):
+        """Float32 rows of ``ids`` (a copy, in the order given); every id must be stored."""
+        rows = self.rows(ids)
+        if (rows < 0).any():
+            missing = np.asarray(ids, dtype='int64')[rows < 0]
+            raise KeyError(f"{len(missing)} chunk ids not in {self.base} (first: {missing[0]})")
+        # Reading in row order keeps the page-cache access sequential
+        order = np.argsort(rows, kind='stable')
+        out = np.empty((len(rows), self.dim), dtype='float32')
+        out[order] = self.vectors[rows[order]]
+        return out
+
+    def rerank(self, queries, candidates, k):
+        """Exact inner-product top ``k`` among approximate ``candidates`` (-1 = empty slot).
+
+        Returns ``(scores, ids)`` shaped like a FAISS search result. Candidates
+        shared by several queries are read once for the whole block; those
+        the store does not hold are dropped.
+        """
+        queries = np.asarray(queries, dtype='float32')
+        candidates = np.asarray(candidates, dtype='int64')
+        rows = self.rows(candidates.ravel()).reshape(candidates.shape)
+        valid = rows >= 0
+        unique, inverse = np.unique(rows[valid], return_inverse=True)
+        vectors = np.asarray(self.vectors[unique])  # sorted rows: sequential reads
+        exact = np.full(candidates.shape, -np.inf, dtype='float32')
+        owners = np.repeat(np.arange(len(queries)), valid.sum(axis=1))
+        exact[valid] = np.einsum('ij,ij->i', vectors[inverse], queries[owners])
+        top = np.argsort(-exact, axis=1, kind='stable')[:, :k]
+        scores = np.full((len(queries), k), -np.inf, dtype='float32')
+        ids = np.full((len(queries), k), -1, dtype='int64')
+        scores[:, :top.shape[1]] = np.take_along_axis(exact, top, axis=1)
+        ids[:, :top.shape[1]] = np.where(np.isfinite(scores[:, :top.shape[1]]),
+                                         np.take_along_axis(candidates, top, axis=1), -1)
+        return scores, ids
+
+    def close(self):
+        self.ids = self.vectors = None
+
+
+class VectorStoreWriter:
+    """Append-only writer.
+
+    With ``append`` rows are added to the end of the existing store (created
+    if missing); otherwise a new store replaces the old one on ``close()``.
+    """
+
+    def __init__(self, base, append=False):
+        self.base = base
+        self.count = 0
+        if append:
+            self._tmp_paths = None
+            self._vectors, self._ids = (open(path, 'ab') for path in store_paths(base))
+        else:
+            self._tmp_paths = [f"{path}.tmp" for path in store_paths(base)]
+            self._vectors = open(self._tmp_paths[0], 'wb')
+            self._ids = open(self._tmp_paths[1], 'wb')
+
+    def append(self, ids, vectors):
+        self._vectors.write(np.ascontiguousarray(vectors, dtype='<f4').tobytes())
+        self._ids.write(np.ascontiguousarray(ids, dtype='<i8').tobytes())
+        self.count += len(ids)
+
+    def close(self):
+        self._vectors.close()
+        self._ids.close()
+        if self._tmp_paths is not None:
+            for tmp_path, path in zip(self._tmp_paths, store_paths(self.base)):
+                os.replace(tmp_path, path)
+
+
+def compact_store(store, batch=65_536):
+    """Rewrite ``store`` without its dead rows; returns the reopened store."""
+    writer = VectorStoreWriter(store.base)
+    live = store.live_ids()
+    for start in range(0, len(live), batch):
+        part = live[start:start + batch]
+        writer.append(part, store.vectors_for(part))
+    base, dim = store.base, store.dim
+    store.close()
+    writer.close()
+    return VectorStore(base, dim, writable=True)
+
+
+def truncate_store(base, rows, dim):
+    """Drop rows past the first ``rows`` (appended by a run that did not finish)."""
+    vectors_path, ids_path = store_paths(base)
+    if os.path.exists(ids_path) and os.path.getsize(ids_path) > rows * 8:
+        os.truncate(ids_path, rows * 8)
+        os.truncate(vectors_path, rows * dim * 4)
+
+
+def remove_store(base):
+    for path in store_paths(base):
+        if os.path.exists(path):
+            os.remove(path)